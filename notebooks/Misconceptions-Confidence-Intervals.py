@@ -56,72 +56,18 @@ from __future__ import division
 from IPython.display import Image as Image
 
 # +
-from matplotlib.patches import Polygon
+from power_analysis import stat_power as _stat_power
+from power_plots import PowerPlot
 
 def stat_power(n=16, mu=1., sigma=1., alpha=0.05, plot=False, xlen=500):
     """
-    This function computes the statistical power of an analysis assuming a normal
-    distribution of the data with a one sample t-test
-    
-    Parameters:
-    -----------
-    n: int,
-        The number of sample in the experiment
-    mu: float
-        The mean of the alternative
-    sigma: float
-        The standard deviation of the alternative
-    plot: bool
-        Plot something
-    alpha: float
-        The risk of error (type I)
-    xlen: int
-        Number of points for the display
-    
-    Returns:
-    --------
-    float
-        The statistical power for this number of sample, mu, sigma, alpha
+    power_analysis.stat_power, with the H0 and H1 sampling densities
+    and the power shaded if plot
     """
-    df = n-1
-    theta = np.sqrt(n)*mu/sigma
-    t_alph_null = sst.t.isf(alpha, df)
-    ncrv = sst.nct(df, theta)
-    spow = 1 - ncrv.cdf(t_alph_null)
-    
     if plot:
-        # define the domain of the plot
-        norv = sst.norm(0, 1.)
-        bornesnc = ncrv.isf([0.001, .999])
-        bornesn = norv.isf([0.001, .999])
-        # because the nc t will have higher max borne, and the H0 normal will be on the left
-        x = np.linspace(np.min(bornesn), np.max(bornesnc), xlen)
-        t_line = np.zeros_like(x)
-        # define the line 
-        x_t_line = np.argmin((x-t_alph_null)**2)
-        y_t_line = np.max(np.hstack((ncrv.pdf(x), norv.pdf(x))))
-        t_line[x_t_line] = y_t_line
-
-        fig, ax = plt.subplots()
-        plt.plot(x, ncrv.pdf(x), 'g', x, norv.pdf(x), 'b', x, t_line, 'r')
-        
-        # Make the shaded region
-        # http://matplotlib.org/xkcd/examples/showcase/integral_demo.html
-        a = x[x_t_line]; b =  np.max(bornesnc);
-        ix = np.linspace(a,b)
-        iy = ncrv.pdf(ix)
-        verts = [(a, 0)] + list(zip(ix, iy)) + [(b, 0)]
-        poly = Polygon(verts, facecolor='0.9', edgecolor='0.5')
-        ax.add_patch(poly)
-        
-        ax.set_xlabel("t-value - H1 centred on " + r"$\theta $" + " = %4.2f;  " %theta 
-                      + r"$\mu$" + " = %4.2f" %mu); 
-        ax.set_ylabel("Probability(t)");
-        ax.set_title('H0 and H1 sampling densities ' 
-                     + r'$\beta$' + '= %3.2f' %spow + ' n = %d' %n)
+        PowerPlot(alpha=alpha, xlen=xlen).update(n, mu, sigma)
         plt.show()
-
-    return spow
+    return _stat_power(n, mu, sigma, alpha)
 
 
 
@@ -164,16 +110,9 @@ stat_power(n, mu, sigma, plot=True, alpha = alpha)
 # ### In neuroimaging non corrected p-value are small, let's plot n as a function of alpha :
 
 # + slideshow={"slide_type": "-"}
-def n_power(pw=.8, mu=1., sigma=1., alpha=0.05):
-    """
-    compute the number of subjects needed to get pw given 
-    mu, sigma and alpha
-    """
-    norv = sst.norm(0,1.)
-    ta = norv.ppf(1 - alpha)
-    tb = norv.ppf(1 - pw)
-    n = (sigma*(ta - tb)/mu)**2
-    return n
+# n_power: number of subjects for a power, with the normal approximation
+# sample_size: the exact number, with the non central t distribution
+from power_analysis import n_power, sample_size
 
 
 
@@ -181,8 +120,13 @@ def n_power(pw=.8, mu=1., sigma=1., alpha=0.05):
 mu = .4; sigma = 1.; pw = .8
 
 lnalph = np.arange(1.9,5.1,.1)
-nsub = [n_power(pw, mu, sigma, alpha=10**(-a)) for a in lnalph]
-plt.plot(lnalph, nsub)
+# both broadcast over alpha
+nsub = n_power(pw, mu, sigma, alpha=10**(-lnalph))
+# the normal approximation underestimates n: compare with the exact number
+# of subjects, computed with the non central t distribution
+nsub_exact = sample_size(pw, mu, sigma, alpha=10**(-lnalph))
+plt.plot(lnalph, nsub, lnalph, nsub_exact)
+plt.legend(('normal approximation', 'exact (non central t)'))
 plt.xlabel(' exponent of the detection p-value alpha = 10^{-x} ')
 plt.ylabel(' number of subject required for power = %3.2f ' % pw)
 #xscale('log')
@@ -191,60 +135,10 @@ plt.ylabel(' number of subject required for power = %3.2f ' % pw)
 # ### 2. The uncertainty of small n results is very high. Confidence interval are just above zero.
 
 # + slideshow={"slide_type": "-"}
-def confidence_intervals(Nexp, **prmtrs):
-    """
-    Nexp: the number of experiments done
-    prmtrs: a dictionary with our parameters, 
-        example: prmtrs = {'n':16, 'mu':.3, 'sigma': 1., 'alpha': 0.05}
-        
-    returns arrays of size Nexp with:
-    effect: the estimated effect
-    detect: an array of 0 or 1, 1 when the effect is detected at alpha
-    lCI: lower bound of confidence interval
-    uCI: upper bound of confidence interval
-    """
-    # unpack parameters:
-    n = prmtrs['n']
-    mu = prmtrs['mu']; 
-    alpha = prmtrs['alpha']; 
-    sigma = prmtrs['sigma']
-    df = n-1
-    theta = mu*np.sqrt(n)/sigma
-    
-    # initialize arrays
-    t = np.zeros((Nexp,))
-    effect = np.zeros((Nexp,))
-    lCI = np.zeros((Nexp,))
-    uCI = np.zeros((Nexp,))
-
-    # compute random variables and thresholds
-    norv = sst.norm(0., sigma)
-    strv = sst.t(df)
-    # get the 0.05 t value *under the null* to construct confidence interval
-    t_05 = strv.isf(0.05)
-    # get the alpha level t value *under the null* to detect 
-    t_alph = strv.isf(alpha)
-    
-
-    for experim in range(Nexp):
-        # get n sample
-        sample = norv.rvs(size=(n,)) + mu
-        # effect and normalized effect size
-        effect[experim] = sample.mean()
-        std_error_data = np.std(sample, ddof=1) 
-        std_error_mean = std_error_data/np.sqrt(n) # np.std takes ddof as 
-                                                    # the df of freedom lost! here: 1.
-        t[experim] = effect[experim]/std_error_mean
-        # confidence interval :
-        CI_05 = t_05*std_error_mean
-        lCI[experim] = effect[experim] - CI_05 # t_alph # 
-        uCI[experim] = effect[experim] + CI_05 # t_alph # 
-
-    # number of detection:
-    detect = t>t_alph
-#    print 'number of detections:', xd.shape
-
-    return (effect, detect, lCI, uCI)
+# confidence_intervals simulates Nexp experiments of n subjects, all at once, and
+# returns for each one the effect, whether it is detected at alpha, and the bounds
+# of its confidence interval. The interval here uses t_05 = t.isf(0.05): CI = 0.90
+from ttest_sims import confidence_intervals
 
 # + slideshow={"slide_type": "fragment"}
 #---------------------- parameters ------------------#
@@ -255,7 +149,7 @@ print('mean t value should be around %3.2f \n' %theta)
 
 #--------------  simulate Nexp experiments ---------#
 Nexp = 1000
-effect, detect, lCI, uCI = confidence_intervals(Nexp, **prmtrs)
+effect, detect, lCI, uCI = confidence_intervals(Nexp, CI=.90, **prmtrs)
 
 print("Compare power {:.3} and rate of detection {:.3} ".format(Pw, detect.sum()/Nexp))
 print("Mean effect {:.3f} compared to average detected effect {:3f}".format(
@@ -266,14 +160,18 @@ print("Lower bound > mu: {} lCI > mu {:3f} detected: {} over {}".format(
 
 # -
 
+# +
+# with Nexp = 1000 the rate of detection is only known to ~ +/- 0.03:
+# validate_power simulates enough experiments for a given tolerance, on a grid
+from validate_power import validate_power, report
+print(report(validate_power([10, 30, 100], [0., .25, .5], 1., [.05, .001], tol=0.005)))
+# -
+
 lCI[detect].mean(), (lCI[detect]>mu).sum(), (uCI[detect]<mu).sum(), lCI[detect].shape, lCI.mean()
 
 
 # + slideshow={"slide_type": "fragment"}
 #--------------  plot ------------------------------#
-x = np.arange(Nexp)
-xd = np.arange(detect.sum())
-mu_line = np.ones((Nexp,))*prmtrs['mu']
 
 # print the number of lower confidence interval values that are above the true mean:
 # this should be about the risk of error/2
@@ -284,12 +182,9 @@ print(Nexp)
 # print "(lCI < 0 ", (lCI[detect] < 0).sum() / detect.sum()
 
 f = plt.figure(1).set_size_inches(12,4)
-lines = plt.plot(xd, lCI[detect], 'g-', 
-                 xd, effect[detect], 'b--',
-                 xd, uCI[detect], 'r-',
-                 xd, mu_line[detect], 'k');
-plt.legend( lines, ('lower_bound','detected Effect', 'Upper bound', 'True effect'), 
-                   loc='upper right', shadow=True)
+# one x per detected experiment, or min/max envelopes per pixel for large Nexp
+from ci_plots import plot_detected_intervals
+plot_detected_intervals(effect, detect, lCI, uCI, prmtrs['mu'])
 plt.xlabel(" One x is one experiment where detection occured", fontdict={'size':14})
 plt.ylabel(" Effect value and confidence interval ", fontdict={'size':14})
 plt.title("Detected effects and their confidence interval", fontdict={'size':16});
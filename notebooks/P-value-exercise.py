@@ -143,12 +143,29 @@ while yield_a_pvalue(norm01) > significance_thr:
     nb_of_test_needed += 1
 print(nb_of_test_needed)
 
+# Over many replications, the number of tests needed follows a geometric distribution
+from ttest_sims import waiting_times, compare_waiting_times
+waits = waiting_times(100000, significance_thr=significance_thr)
+k, empirical, analytic = compare_waiting_times(waits, significance_thr=significance_thr)
+plt.bar(k, empirical, label='simulated')
+plt.plot(k, analytic, 'r', label='geometric')
+plt.xlim(0, 100)
+plt.legend()
+
+# draw all the N_pval samples at once rather than calling yield_a_pvalue N_pval times
+from ttest_sims import batch_pvalues
 N_pval = 100
-pvalues = np.asarray([yield_a_pvalue(sst.norm(0,1)) for i in range(N_pval)])
+pvalues = batch_pvalues(sst.norm(0,1), N_pval)
 number_significant = (pvalues <= significance_thr).sum()
 print("We have {} tests significant over {} trials, ie {}%"
               .format(number_significant, N_pval, 100*number_significant/N_pval))
 
+# For a very large number of trials, count the significant tests chunk by chunk
+# without storing the p-values, and stop when the rate is known to +/- 0.001
+from ttest_sims import stream_rejection_rate
+stream_rejection_rate(sst.norm(0,1), significance_thr=significance_thr,
+                      max_trials=10**8, precision=0.001)
+
 
 # #### Sample from non-zero mean:
 
@@ -166,7 +183,7 @@ def launch_a_bunch_of_tests(distrib, N_pval=1000, N=30):
     N_pval: number of p-value to compute
     N : the sample size
     """
-    pvalues = np.asarray([yield_a_pvalue(distrib) for i in range(N_pval)])
+    pvalues = batch_pvalues(distrib, N_pval, N)
     number_significant = (pvalues <= significance_thr).sum()
     print("We have {} tests significant over {} trials, ie {}%"
                   .format(number_significant, N_pval, 100*number_significant/N_pval))
@@ -194,6 +211,19 @@ launch_a_bunch_of_tests(distrib)
 
 # -
 
+# The same demonstration over a grid of m and sigma: the rate of significant
+# tests is the same for all (m, sigma) with the same ratio m/sigma
+from ttest_sims import rejection_rate_sweep, sweep_to_frame
+ms = np.array([.165, 1.65, 16.5])/np.sqrt(N)
+sigmas = np.array([.1, 1., 10.])
+rate, mc_error, coords = rejection_rate_sweep(ms, sigmas, N, alpha=significance_thr)
+sweep_to_frame(rate, mc_error, coords)
+
+# Repeating experiments is not the only way to p-hack. Here is the false positive
+# rate actually obtained with a few common strategies, when the null is true
+import phacking
+rates = phacking.compare_strategies(n_reps=100000, alpha=significance_thr)
+
 # ### Exercise 2: Overfitting
 
 # Overfitting refers to a model (e.g. a GLM) that fits too closely to the data on which it is trained and its predictions can't reproduced on new data.
@@ -208,11 +238,7 @@ launch_a_bunch_of_tests(distrib)
 # +
 import numpy as np
 import matplotlib.pyplot as plt
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import cross_val_score
-from sklearn.metrics import mean_squared_error
+from overfitting import polynomial_degree_sweep
 # Define a function for us to fit; here we'll take a simple cosine
 def true_fun(X):
     return np.cos(1.5 * np.pi * X)
@@ -229,26 +255,22 @@ test_max_value=1
 X = np.sort(np.random.rand(n_samples))
 y = true_fun(X) + np.random.randn(n_samples) * 0.1
 X_test = np.linspace(0, test_max_value, 100)
+
+# Fit the models of all degrees and evaluate them using crossvalidation.
+# This is what the sklearn pipeline
+#     Pipeline([("polynomial_features", PolynomialFeatures(degree, include_bias=False)),
+#               ("linear_regression", LinearRegression())])
+# and cross_val_score(pipeline, X, y, scoring="neg_mean_squared_error", cv=10)
+# compute, but all the degrees share the same factorisation of the data
+# the degree 15 error is huge: an exact fit, not damped by rounding as the ill-conditioned pipeline's
+train_mse, cv_mse, y_model = polynomial_degree_sweep(X, y, degrees, cv=10, X_eval=X_test)
 plt.figure(figsize=(14, 5))
 
 for i in range(len(degrees)):
     ax = plt.subplot(1, len(degrees), i + 1)
     plt.setp(ax, xticks=(), yticks=())
 
-    polynomial_features = PolynomialFeatures(degree=degrees[i],
-                                             include_bias=False)
-    linear_regression = LinearRegression()
-    pipeline = Pipeline([("polynomial_features", polynomial_features),
-                         ("linear_regression", linear_regression)])
-    pipeline.fit(X[:, np.newaxis], y)
-
-    # Evaluate the models using crossvalidation
-    train_score = mean_squared_error(y, pipeline.predict(X[:, np.newaxis]))
-    scores = cross_val_score(pipeline, X[:, np.newaxis], y,
-                             scoring="neg_mean_squared_error", cv=10)
-
-    
-    plt.plot(X_test, pipeline.predict(X_test[:, np.newaxis]), label="Model")
+    plt.plot(X_test, y_model[i], label="Model")
     plt.plot(X_test, true_fun(X_test), label="True function")
     plt.scatter(X, y, edgecolor='b', s=20, label="Samples")
     plt.xlabel("x")
@@ -257,7 +279,7 @@ for i in range(len(degrees)):
     plt.ylim((-2, 2))
     plt.legend(loc="best")
     plt.title("Degree {}\nSample Error: {:.2e}\nOut of sample err. = {:.2e}(+/- {:.1e})".format(
-        degrees[i], train_score.mean(), -scores.mean(), scores.std()))
+        degrees[i], train_mse[i], cv_mse[:, i].mean(), cv_mse[:, i].std()))
 plt.show()
 # -
 
@@ -281,12 +303,8 @@ plt.show()
 
 # +
 import pandas as pd
-from sklearn import linear_model
-from sklearn.linear_model import LinearRegression
-from sklearn.model_selection import cross_val_score
 
 data = pd.read_csv('brain_size.csv', delimiter=';', header=0, index_col=0)
-linear_regression = LinearRegression()
 # -
 
 # Let's first look at our data:
@@ -314,27 +332,17 @@ xind = np.argsort(X_test)
 X_test = np.take_along_axis(X_test, xind, 0)[:, np.newaxis]
 y_test = np.array(data[predicted_variable][num_subject:]).T
 y_test = np.take_along_axis(y_test, xind, 0)[:, np.newaxis]
+
+# Fit the models and evaluate them using crossvalidation, as in exercise 2
+m_range = np.linspace(np.min(X), np.max(X), 100)[:, np.newaxis]
+train_mse, cv_mse, y_model = polynomial_degree_sweep(X, y, degrees, cv=10, X_eval=m_range)
 plt.figure(figsize=(14, 5))
 
 for i in range(len(degrees)):
     ax = plt.subplot(1, len(degrees), i + 1)
     plt.setp(ax, xticks=(), yticks=())
 
-    polynomial_features = PolynomialFeatures(degree=degrees[i],
-                                             include_bias=False)
-    linear_regression = LinearRegression()
-    pipeline = Pipeline([("polynomial_features", polynomial_features),
-                         ("linear_regression", linear_regression)])
-    pipeline.fit(X, y)
-
-    # Evaluate the models using crossvalidation
-    train_score = mean_squared_error(y, pipeline.predict(X))
-    scores = cross_val_score(pipeline, X, y,
-                             scoring="neg_mean_squared_error", cv=10)
-
-    m_range = np.linspace(np.min(X), np.max(X), 100)[:, np.newaxis]
-    
-    plt.plot(m_range, pipeline.predict(m_range), label="Model")
+    plt.plot(m_range, y_model[i], label="Model")
     plt.scatter(X_test, y_test, label="Test data")
     plt.scatter(X, y, edgecolor='b', s=20, label="Samples")
     plt.xlabel("x")
@@ -343,10 +351,14 @@ for i in range(len(degrees)):
     plt.ylim((np.min(y)*0.9, np.max(y)*1.1))
     plt.legend(loc="best")
     plt.title("Degree {}\nSample Error: {:.2e}\nOut of sample err. = {:.2e}(+/- {:.1e})".format(
-        degrees[i], train_score.mean(), -scores.mean(), scores.std()))
+        degrees[i], train_mse[i], cv_mse[:, i].mean(), cv_mse[:, i].std()))
 plt.show()
 # -
 
+# The same errors for every pair of variables of the dataset, in one call
+from overfitting import cross_validate_pairs
+cross_validate_pairs(data, degrees, cv=10)
+
 # ### Avoiding overfitting
 
 # Overfitting is caused by having a model that is too complex for the amount of available data. Such situations are sometimes unavoidable; however, there are ways of reducing the risks of overfitting
@@ -158,6 +158,13 @@ z = n01.isf(6.6311e-10)
 d = n01.isf(6.6311e-10)/np.sqrt(733)
 print("z = %4.3f d = %4.3f " %(z,d))
 
+# +
+# the same for a whole table of reported results (p-values can be given as text,
+# even below the smallest float, eg "1e-400"), with the power of each design
+from effect_sizes import back_calculate
+back_calculate(['6.6311e-10', '1e-400'], [733, 733], test='z', sides=1, effects=(.1, .2))
+# -
+
 # + slideshow={"slide_type": "skip"}
 import scipy.stats as sst
 import numpy as np
@@ -170,85 +177,22 @@ import matplotlib.pyplot as plt
 # Optionally plot power as a function of nfrom matplotlib.patches import Polygon
 
 
-def stat_power(n=16, mu=1., sigma=1., alpha=0.05):
-    """
-    This function computes the statistical power of an analysis assuming a normal
-    distribution of the data with a one sample t-test
-    
-    Parameters:
-    -----------
-    n: int,
-        The number of sample in the experiment
-    mu: float
-        The mean of the alternative
-    sigma: float
-        The standard deviation of the alternative
-    plot: bool
-        Plot something
-    alpha: float
-        The risk of error (type I)
-    xlen: int
-        Number of points for the display
-    
-    Returns:
-    --------
-    float
-        The statistical power for this number of sample, mu, sigma, alpha
-    """
-    df = n-1
-    theta = np.sqrt(n)*mu/sigma    
-    t_alph_null = sst.t.isf(alpha, df)
-    ncrv = sst.nct(df, theta)
-    spow = 1 - ncrv.cdf(t_alph_null)
-
-    return spow
+# stat_power computes, for normal data and a one sample t-test:
+#     df = n-1
+#     theta = np.sqrt(n)*mu/sigma
+#     t_alph_null = sst.t.isf(alpha, df)
+#     spow = 1 - sst.nct(df, theta).cdf(t_alph_null)
+# n, mu, sigma and alpha can be arrays: the power of a whole grid is computed at once
+from power_analysis import stat_power
 
 
 
 # +
-from matplotlib.patches import Polygon
-
-def plot_power(n=16, mu=1., sigma=1., alpha=0.05, xlen=500):
-    
-    df = n-1
-    theta = np.sqrt(n)*mu/sigma
-    ncrv = sst.nct(df, theta)
-    t_alph_null = sst.t.isf(alpha, df)
-    spow = 1 - ncrv.cdf(t_alph_null)
-
-    
-    # define the domain of the plot
-    norv = sst.norm(0, 1.)
-    bornesnc = ncrv.isf([0.001, .999])
-    bornesn = norv.isf([0.001, .999])
-    
-    # because the nc t will have higher max borne, and the H0 normal will be on the left
-    x = np.linspace(np.min(bornesn), np.max(bornesnc), xlen)
-    t_line = np.zeros_like(x)
-    
-    # define the line 
-    x_t_line = np.argmin((x-t_alph_null)**2)
-    y_t_line = np.max(np.hstack((ncrv.pdf(x), norv.pdf(x))))
-    t_line[x_t_line] = y_t_line
-
-    fig, ax = plt.subplots()
-    plt.plot(x, ncrv.pdf(x), 'g', x, norv.pdf(x), 'b', x, t_line, 'r')
-        
-    # Make the shaded region
-    # http://matplotlib.org/xkcd/examples/showcase/integral_demo.html
-    a = x[x_t_line]; b =  np.max(bornesnc);
-    ix = np.linspace(a,b)
-    iy = ncrv.pdf(ix)
-    verts = [(a, 0)] + list(zip(ix, iy)) + [(b, 0)]
-    poly = Polygon(verts, facecolor='0.9', edgecolor='0.5')
-    ax.add_patch(poly)
-        
-    ax.set_xlabel("t-value - H1 centred on " + r"$\theta $" + " = %4.2f;  " %theta 
-                      + r"$\mu$" + " = %4.2f" %mu); 
-    ax.set_ylabel("Probability(t)");
-    ax.set_title('H0 and H1 sampling densities ' 
-                     + r'$\beta$' + '= %3.2f' %spow + ' n = %d' %n)
-    plt.show()
+# plot_power draws the H0 and H1 sampling densities with a PowerPlot, which
+# creates its lines and shaded region once: power_plot.update(n, mu, sigma)
+# redraws the same figure, power_plot.animate(frames) and
+# power_plot.save_frames(frames) render a whole sequence of parameters
+from power_plots import PowerPlot, plot_power, plot_power_curves
 
 
 # + slideshow={"slide_type": "slide"}
@@ -269,6 +213,27 @@ plot_power(n, mu, sigma, alpha=0.05, xlen=500)
 
 print("Power = ", pwr, "      Z effect (Non centrality parameter): ", mu*np.sqrt(n)/sigma)
 
+# +
+# the same figure, animated for a growing number of subjects
+power_plot = PowerPlot(alpha=0.05)
+anim = power_plot.animate([(n, .5, 1.) for n in range(5, 80, 2)], interval=100)
+plt.close(power_plot.ax.figure)
+HTML(anim.to_jshtml())
+# -
+
+# +
+# power of one design per slider move: PowerTable reads it from a table
+# computed once and cached on disk (the first lookup in the table takes
+# ~10 s), and computes it exactly where the interpolation could be off
+from ipywidgets import interact
+from power_analysis import PowerTable
+power_table = PowerTable()
+
+@interact(n=(3, 200), mu=(0., 1.5, .01), alpha=[0.05, 0.01, 0.005, 0.001])
+def table_power(n=30, mu=.5, alpha=0.05):
+    print("Power = %5.3f" % power_table.power(n, mu, 1., alpha))
+# -
+
 
 # + [markdown] slideshow={"slide_type": "slide"}
 # ### Plot power as a function of the number of subject in the study
@@ -290,15 +255,9 @@ def pwr_funcofsubj(muse, nses, alpha=.05, sigma=1):
     sigma: float, 
           data sigma
     """
-    mstr = [ 'd='+str(m) for m in np.asarray(muse)/sigma]
-    lines=[]
-    for mu in (muse):
-        pw = [stat_power(n, mu, sigma, alpha=alpha) for n in nses]    
-        (pl,) = plt.plot(nses, pw)
-        lines.append(pl)
-    plt.legend( lines, mstr, loc='upper right', shadow=True)
-    plt.xlabel(" Number of subjects ")
-    plt.ylabel(" Power ");
+    # power for all (mu, n) at once (critical values computed once per n),
+    # drawn as a single LineCollection: one curve per effect size
+    plot_power_curves(muse, nses, sigma=sigma, alpha=alpha)
     
     return None
 
@@ -340,6 +299,13 @@ alph = 0.05
 pwr_funcofsubj(mus, nse, alph)
 # -
 
+# +
+# with 30000 tests (eg voxels), 10% of them on a true effect: power per test and
+# error rates with the Bonferroni, Holm and Benjamini-Hochberg corrections
+from multiple_testing import mass_univariate_power
+mass_univariate_power(m=30000, fraction=.1, n=30, mu=.5, sigma=1., alpha=0.05, n_reps=200)
+# -
+
 
 
 #Example: 
@@ -0,0 +1,354 @@
+"""
+Bootstrap confidence intervals (percentile and BCa) of means, correlations
+and Cohen's d, for all the columns of a table at once, as pingouin gives
+them for one statistic at a time in python_statistics_showcase.
+
+A resample is represented by its counts: how many times each observation
+is drawn. All the statistics here are computed from weighted sums, so for a
+chunk of resamples they are matrix products of the (resamples x
+observations) count matrix with the data. The resamples are drawn once, kept
+as small integer counts and shared by all the statistics and all the
+columns. The statistics are then bootstrapped one block of columns at a
+time: the statistics of all the resamples are computed chunk by chunk for
+the columns of the block only, and reduced to the estimate, standard error
+and quantiles before the next block. The memory used grows with the number
+of resamples times the number of observations (the counts) and times the
+size of a block, not with the number of statistics.
+
+The jackknife needed by BCa is the same computation, with the weights of
+the leave-one-out samples (all ones but one zero).
+
+Missing values (nan) are left out column by column (pair by pair for the
+correlations), as pandas and pingouin do.
+"""
+import numpy as np
+import scipy.stats as sst
+
+from ttest_sims import check_random_state
+
+METHODS = ('percentile', 'bca')
+
+
+def _as_columns(data):
+    """ (n, p) float array and the column names of a table or a vector """
+    if hasattr(data, 'columns'):
+        return np.asarray(data, dtype=float), [str(c) for c in data.columns]
+    values = np.asarray(data, dtype=float)
+    if values.ndim == 1:
+        name = getattr(data, 'name', None)
+        return values[:, np.newaxis], [str(0 if name is None else name)]
+    return values, [str(i) for i in range(values.shape[1])]
+
+
+def _weighted_sums(weights, values):
+    """
+    Sums of the observed values and numbers of observations for each
+    weighting: weights (b, n), values (n, p) with nans -> two (b, p) arrays
+    """
+    observed = ~np.isnan(values)
+    return (weights.dot(np.where(observed, values, 0.)),
+            weights.dot(observed.astype(float)))
+
+
+def means(data):
+    """
+    Column means of a table
+
+    Returns:
+    --------
+    statistic: function
+        From a (b, n) weight matrix (and a slice of the columns, all by
+        default) to the (b, p) weighted means
+    labels: list of str
+        The column names
+    n: int
+        The number of observations
+    """
+    values, labels = _as_columns(data)
+
+    def statistic(weights, columns=slice(None)):
+        sums, counts = _weighted_sums(weights, values[:, columns])
+        return sums/counts
+    return statistic, labels, values.shape[0]
+
+
+def correlations(x, y=None):
+    """
+    Pearson correlations of each column of x with each column of y, or
+    between all the pairs of columns of x if y is None
+
+    Returns:
+    --------
+    statistic: function
+        From a (b, n) weight matrix (and a slice of the pairs, all by
+        default) to the (b, number of pairs) weighted correlations
+    labels: list of str
+        'x_column-y_column' for each pair
+    n: int
+        The number of observations
+    """
+    x_values, x_labels = _as_columns(x)
+    if y is None:
+        first, second = np.triu_indices(x_values.shape[1], k=1)
+        y_values, y_labels = x_values, x_labels
+    else:
+        y_values, y_labels = _as_columns(y)
+        first, second = (a.ravel() for a in np.meshgrid(
+            np.arange(x_values.shape[1]), np.arange(y_values.shape[1]),
+            indexing='ij'))
+    # centred on the sample means, so that the weighted moments below do
+    # not lose precision
+    a = x_values[:, first] - np.nanmean(x_values[:, first], axis=0)
+    b = y_values[:, second] - np.nanmean(y_values[:, second], axis=0)
+    # complete pairs only
+    missing = np.isnan(a) | np.isnan(b)
+    a[missing] = np.nan
+    b[missing] = np.nan
+    labels = ['{}-{}'.format(x_labels[i], y_labels[j])
+              for i, j in zip(first, second)]
+
+    def statistic(weights, columns=slice(None)):
+        a_c, b_c = a[:, columns], b[:, columns]
+        sum_a, counts = _weighted_sums(weights, a_c)
+        sum_b, _ = _weighted_sums(weights, b_c)
+        sum_ab, _ = _weighted_sums(weights, a_c*b_c)
+        sum_aa, _ = _weighted_sums(weights, a_c*a_c)
+        sum_bb, _ = _weighted_sums(weights, b_c*b_c)
+        cov = sum_ab - sum_a*sum_b/counts
+        return cov/np.sqrt((sum_aa - sum_a**2/counts)
+                           * (sum_bb - sum_b**2/counts))
+    return statistic, labels, a.shape[0]
+
+
+def cohen_d(data, group):
+    """
+    Cohen's d of each column of a table between two groups of observations,
+    (mean of group - mean of the others) / pooled standard deviation
+
+    Use the group as strata of the bootstrap, so that the size of the
+    groups is the same in all the resamples.
+
+    Parameters:
+    -----------
+    data: DataFrame, Series or array
+        The observations, in rows
+    group: array of bool
+        True for the observations of the first group
+
+    Returns:
+    --------
+    statistic: function
+        From a (b, n) weight matrix (and a slice of the columns, all by
+        default) to the (b, p) weighted Cohen's d
+    labels: list of str
+        The column names
+    n: int
+        The number of observations
+    """
+    values, labels = _as_columns(data)
+    group = np.asarray(group, dtype=bool)
+    groups = [np.where(g[:, np.newaxis], values, np.nan)
+              for g in (group, ~group)]
+
+    def statistic(weights, columns=slice(None)):
+        moments = []
+        for values_g in (g[:, columns] for g in groups):
+            sums, counts = _weighted_sums(weights, values_g)
+            mean = sums/counts
+            squares, _ = _weighted_sums(weights, values_g**2)
+            moments.append((mean, counts, squares - counts*mean**2))
+        (mean_1, n_1, ss_1), (mean_0, n_0, ss_0) = moments
+        return (mean_1 - mean_0)/np.sqrt((ss_1 + ss_0)/(n_1 + n_0 - 2))
+    return statistic, labels, values.shape[0]
+
+
+def resample_counts(n, n_boot=10000, chunk_size=1000, random_state=None,
+                    strata=None):
+    """
+    Bootstrap resamples of n observations, chunk by chunk, as counts
+
+    Parameters:
+    -----------
+    n: int
+        The number of observations
+    n_boot: int
+        The number of resamples
+    chunk_size: int
+        The number of resamples per chunk
+    random_state: None, int or numpy Generator
+        None uses the global numpy random state
+    strata: None or array of labels
+        If given, the observations are drawn within each stratum
+
+    Yields:
+    -------
+    (chunk_size, n) float arrays
+        The number of times each observation is drawn in each resample
+    """
+    random_state = check_random_state(random_state)
+    if random_state is None:
+        # the global numpy random state
+        random_state = np.random
+    # numpy Generators draw integers with integers, RandomStates with randint
+    draw = getattr(random_state, 'integers', None) or random_state.randint
+    if strata is None:
+        strata = np.zeros(n, dtype=int)
+    members = [np.flatnonzero(strata == s) for s in np.unique(strata)]
+    for start in range(0, n_boot, chunk_size):
+        size = min(chunk_size, n_boot - start)
+        indices = np.concatenate(
+            [m[draw(0, m.size, size=(size, m.size))]
+             for m in members], axis=1)
+        # one bincount for the whole chunk: resample i counts in row i
+        offsets = n*np.arange(size)[:, np.newaxis]
+        yield np.bincount((indices + offsets).ravel(),
+                          minlength=size*n).reshape(size, n).astype(float)
+
+
+def _jackknife(statistic, n, chunk_size):
+    """ the statistic of the n leave-one-out samples, (n, k) """
+    chunks = []
+    for start in range(0, n, chunk_size):
+        weights = np.ones((min(chunk_size, n - start), n))
+        weights[np.arange(weights.shape[0]),
+                start + np.arange(weights.shape[0])] = 0
+        chunks.append(statistic(weights))
+    return np.concatenate(chunks)
+
+
+def _quantiles(sorted_values, q):
+    """
+    Linear interpolation quantiles of each column of sorted_values (nans
+    last), at a probability q per column
+    """
+    finite = (~np.isnan(sorted_values)).sum(axis=0)
+    # nan where q is nan or no value is finite
+    position = np.clip(q, 0, 1)*(finite - 1)
+    undefined = ~(position >= 0)
+    position = np.where(undefined, 0., position)
+    below = np.floor(position).astype(int)
+    above = np.minimum(below + 1, np.maximum(finite - 1, 0))
+    columns = np.arange(sorted_values.shape[1])
+    fraction = position - below
+    quantiles = ((1 - fraction)*sorted_values[below, columns]
+                 + fraction*sorted_values[above, columns])
+    return np.where(undefined, np.nan, quantiles)
+
+
+def bca_quantiles(estimate, boot, jackknife, q):
+    """
+    Bias corrected and accelerated probabilities for the quantiles q of
+    the bootstrap distributions (Efron & Tibshirani, 1993, chap. 14)
+
+    Parameters:
+    -----------
+    estimate: (k,) array
+        The statistics of the sample
+    boot: (n_boot, k) array
+        The statistics of the resamples
+    jackknife: (n, k) array
+        The statistics of the leave-one-out samples
+    q: float
+        The quantile of the percentile method
+
+    Returns:
+    --------
+    (k,) array
+    """
+    valid = (~np.isnan(boot)).sum(axis=0)
+    below = ((boot < estimate).sum(axis=0)
+             + .5*(boot == estimate).sum(axis=0))
+    z0 = sst.norm.ppf(below/valid)
+    deviation = np.nanmean(jackknife, axis=0) - jackknife
+    spread = np.nansum(deviation**2, axis=0)
+    # no acceleration for statistics that do not vary (eg a correlation of 1)
+    acceleration = (np.nansum(deviation**3, axis=0)
+                    / (6*np.where(spread > 0, spread, 1.)**1.5))
+    z = z0 + sst.norm.ppf(q)
+    return sst.norm.cdf(z0 + z/(1 - acceleration*z))
+
+
+def bootstrap(statistics, n_boot=10000, ci=.95, method='bca',
+              chunk_size=1000, block_size=100, random_state=None,
+              strata=None):
+    """
+    Bootstrap confidence intervals of several statistics, all computed on
+    the same resamples
+
+    Parameters:
+    -----------
+    statistics: dict
+        Name: (statistic, labels, n) as returned by means, correlations
+        and cohen_d, all for the same n observations
+    n_boot: int
+        The number of resamples
+    ci: float
+        The confidence level
+    method: str
+        'percentile' or 'bca'
+    chunk_size: int
+        The number of resamples processed at once
+    block_size: int
+        The number of statistics bootstrapped at once: the statistics of
+        the resamples take n_boot x block_size floats
+    random_state: None, int or numpy Generator
+        None uses the global numpy random state
+    strata: None or array of labels
+        Resample within each stratum (eg the groups of cohen_d)
+
+    Returns:
+    --------
+    pandas DataFrame
+        Indexed by (statistic, label), with columns 'estimate', 'se' (the
+        bootstrap standard error), 'low' and 'high'
+    """
+    import pandas as pd
+
+    if method not in METHODS:
+        raise ValueError("method has to be one of {}, got {}".format(
+            METHODS, method))
+    names = list(statistics)
+    n_obs = set(statistics[name][2] for name in names)
+    if len(n_obs) != 1:
+        raise ValueError("the statistics have to be of the same "
+                         "observations, got sizes {}".format(sorted(n_obs)))
+    n = n_obs.pop()
+    functions = [statistics[name][0] for name in names]
+    sizes = [len(statistics[name][1]) for name in names]
+    offsets = np.cumsum([0] + sizes[:-1])
+
+    def statistic(weights, start, stop):
+        """ the statistics start to stop of all the functions """
+        return np.concatenate(
+            [f(weights, slice(max(start - offset, 0), stop - offset))
+             for f, offset, size in zip(functions, offsets, sizes)
+             if offset < stop and start < offset + size], axis=1)
+
+    # the counts fit in the smallest integer type that holds n
+    counts = [weights.astype(np.min_scalar_type(n)) for weights in
+              resample_counts(n, n_boot, chunk_size, random_state, strata)]
+    results = []
+    for start in range(0, sum(sizes), block_size):
+        stop = min(start + block_size, sum(sizes))
+        estimate = statistic(np.ones((1, n)), start, stop)[0]
+        boot = np.concatenate([statistic(weights.astype(float), start, stop)
+                               for weights in counts])
+        q = np.array([(1 - ci)/2, (1 + ci)/2])
+        if method == 'bca':
+            jackknife = _jackknife(
+                lambda weights: statistic(weights, start, stop), n,
+                chunk_size)
+            q = [bca_quantiles(estimate, boot, jackknife, q_i) for q_i in q]
+        else:
+            q = [np.full(estimate.shape, q_i) for q_i in q]
+        boot.sort(axis=0)
+        low, high = (_quantiles(boot, q_i) for q_i in q)
+        results.append(np.column_stack(
+            [estimate, np.nanstd(boot, axis=0, ddof=1), low, high]))
+
+    index = pd.MultiIndex.from_tuples(
+        [(name, label) for name in names for label in statistics[name][1]],
+        names=['statistic', 'label'])
+    return pd.DataFrame(np.concatenate(results),
+                        columns=['estimate', 'se', 'low', 'high'],
+                        index=index)
@@ -0,0 +1,128 @@
+"""
+The "Detected effects and their confidence interval" figure of evil-p and
+Misconceptions-Confidence-Intervals, for any number of experiments.
+
+With more experiments than the axes have pixels, the lines cannot show each
+experiment anyway: `plot_detected_intervals` then bins the experiments by
+pixel column and draws, for each bin, the range (min to max) of the lower
+bounds, effects and upper bounds. The experiments whose interval misses the
+true effect are aggregated the same way (the farthest miss of each pixel
+column is marked), so that every pixel column with a miss is highlighted.
+What is drawn grows with the width of the figure, not with the number of
+experiments.
+"""
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.lines import Line2D
+
+
+def minmax_envelope(y, n_bins, mask=None):
+    """
+    Min and max of y over n_bins consecutive bins of (almost) equal size
+
+    Parameters:
+    -----------
+    y: 1D array
+        At least n_bins values
+    n_bins: int
+        The number of bins
+    mask: None or 1D array of bool
+        If given, only the values where mask is True are used
+
+    Returns:
+    --------
+    starts: int array
+        Index of the first value of each bin
+    low, high: float arrays
+        The min and max of each bin, nan for bins without values
+    """
+    y = np.asarray(y, dtype=float)
+    if not 0 < n_bins <= y.size:
+        raise ValueError("n_bins has to be between 1 and {}, got {}".format(
+            y.size, n_bins))
+    starts = np.linspace(0, y.size, n_bins + 1).astype(int)[:-1]
+    if mask is None:
+        return (starts, np.minimum.reduceat(y, starts),
+                np.maximum.reduceat(y, starts))
+    low = np.minimum.reduceat(np.where(mask, y, np.inf), starts)
+    high = np.maximum.reduceat(np.where(mask, y, -np.inf), starts)
+    empty = ~np.logical_or.reduceat(mask, starts)
+    low[empty] = np.nan
+    high[empty] = np.nan
+    return starts, low, high
+
+
+def _axes_pixels(ax):
+    """ width of the axes, in pixels of the figure """
+    return max(int(np.ceil(ax.get_window_extent().width)), 1)
+
+
+def plot_detected_intervals(effect, detect, lCI, uCI, mu, ax=None,
+                            decimate=None):
+    """
+    Plot the detected effects and their confidence intervals, one x per
+    detected experiment, with the intervals that miss mu highlighted
+
+    Parameters:
+    -----------
+    effect, detect, lCI, uCI: arrays
+        As returned by ttest_sims.confidence_intervals
+    mu: float
+        The true effect
+    ax: None or matplotlib Axes
+        Where to draw, the current axes if None
+    decimate: None or bool
+        Draw min/max envelopes per pixel column instead of every
+        experiment. If None, only when there are more detected experiments
+        than twice the width of the axes in pixels
+
+    Returns:
+    --------
+    list of matplotlib Line2D
+        The legend handles of the lower bounds, effects, upper bounds, true
+        effect and missed intervals
+    """
+    ax = plt.gca() if ax is None else ax
+    low, value, high = (np.asarray(a)[detect] for a in (lCI, effect, uCI))
+    # the bound that misses mu: the lower one above, or the upper one below
+    miss_high = low > mu
+    miss_low = high < mu
+    n_bins = _axes_pixels(ax)
+    if decimate is None:
+        decimate = low.size > 2*n_bins
+    styles = (('g', '-'), ('b', '--'), ('r', '-'))
+
+    if not decimate or low.size <= n_bins:
+        xd = np.arange(low.size)
+        for series, (color, linestyle) in zip((low, value, high), styles):
+            ax.plot(xd, series, color=color, linestyle=linestyle)
+        misses = [(xd[miss_high], low[miss_high]),
+                  (xd[miss_low], high[miss_low])]
+    else:
+        for series, (color, _) in zip((low, high, value), styles[::2]
+                                      + styles[1:2]):
+            starts, y_low, y_high = minmax_envelope(series, n_bins)
+            # the last bin ends at the last experiment
+            ax.fill_between(np.append(starts, low.size - 1),
+                            np.append(y_low, y_low[-1]),
+                            np.append(y_high, y_high[-1]), step='post',
+                            facecolor=color, edgecolor=color, linewidth=.5)
+        # per pixel column, the farthest miss on each side
+        starts, _, farthest_high = minmax_envelope(low, n_bins, miss_high)
+        _, farthest_low, _ = minmax_envelope(high, n_bins, miss_low)
+        misses = [(starts[~np.isnan(y)], y[~np.isnan(y)])
+                  for y in (farthest_high, farthest_low)]
+    for x_miss, y_miss in misses:
+        ax.plot(x_miss, y_miss, 'm.', markersize=4)
+    ax.axhline(mu, color='k')
+    ax.set_xlim(0, max(low.size - 1, 1))
+
+    handles = [Line2D([], [], color=color, linestyle=linestyle)
+               for color, linestyle in styles + (('k', '-'),)]
+    handles.append(Line2D([], [], color='m', marker='.', linestyle=''))
+    ax.legend(handles, ('lower_bound', 'detected Effect', 'Upper bound',
+                        'True effect',
+                        'mu not in CI ({})'.format(int(miss_high.sum()
+                                                       + miss_low.sum()))),
+              loc='upper right', shadow=True)
+    return handles
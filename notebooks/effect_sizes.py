@@ -0,0 +1,304 @@
+"""
+Effect sizes back-calculated from reported p-values and sample sizes, as
+in the APOE example of Power-basics (`z = n01.isf(p)`, `d = z/np.sqrt(n)`),
+for a whole table of published results at once.
+
+P-values are handled in log space: p-values given as text are parsed into
+log(p) without going through a float, so that "1e-400" is not rounded to 0,
+and the test statistics are computed from log(p). This keeps z, t and d
+accurate well below the smallest double (~1e-308).
+
+Command line use, eg
+
+    python effect_sizes.py results.csv effect_sizes.csv -e .2,.5,.8
+
+where results.csv has columns p and n, and optionally test ('z',
+'one-sample', 'paired' or 'two-sample') and sides (1 or 2).
+"""
+from optparse import OptionParser
+
+import numpy as np
+import scipy.special as ssp
+import scipy.stats as sst
+
+from power_analysis import paired_power, two_sample_power
+
+TESTS = ('z', 'one-sample', 'paired', 'two-sample')
+
+# below this, sst.norm.isf is not used
+_SMALLEST_P = 1e-300
+
+
+def log_pvalues(p):
+    """
+    Natural log of p-values given as numbers or as text
+
+    Text is parsed as mantissa and exponent, so that p-values that underflow
+    as floats (eg "3.2e-512") keep their value.
+
+    Returns:
+    --------
+    array of float
+    """
+    p = np.asarray(p)
+    if p.dtype.kind not in 'US':
+        with np.errstate(divide='ignore'):
+            return np.log(p.astype(float))
+    text = np.char.lower(np.char.strip(p.astype(str)))
+    mantissa, _, exponent = np.char.partition(text, 'e').T
+    exponent = np.where(exponent == '', '0', exponent).astype(float)
+    with np.errstate(divide='ignore'):
+        return np.log(mantissa.astype(float)) + exponent*np.log(10)
+
+
+def norm_isf_log(log_p):
+    """
+    sst.norm.isf(exp(log_p)), also for p-values too small to be a float
+    """
+    log_p = np.asarray(log_p, dtype=float)
+    # p = 0 gives inf
+    small = np.isfinite(log_p) & (log_p < np.log(_SMALLEST_P))
+    z = np.array(sst.norm.isf(np.exp(np.where(small, 0., log_p))),
+                 dtype=float, ndmin=1)
+    if small.any():
+        # asymptotic start, then Newton steps on the log survival function
+        # (sst.norm.logsf is accurate far in the tail)
+        u = -2*log_p[small]
+        z_s = np.sqrt(u - np.log(2*np.pi*u))
+        for _ in range(4):
+            logsf = sst.norm.logsf(z_s)
+            z_s += ((logsf - log_p[small])
+                    / np.exp(sst.norm.logpdf(z_s) - logsf))
+        z[small.ravel()] = z_s
+    return z.reshape(log_p.shape)
+
+
+def _beta_fraction(a, b, x, max_iter=10000):
+    """
+    Continued fraction of the incomplete beta function (modified Lentz),
+    I_x(a, b) = x^a (1 - x)^b / (a B(a, b)) * _beta_fraction(a, b, x),
+    which converges for x < (a + 1) / (a + b + 2)
+    """
+    tiny = 1e-300
+    c = np.ones_like(x)
+    d = 1 - (a + b)*x/(a + 1)
+    d = 1/np.where(np.abs(d) < tiny, tiny, d)
+    h = d.copy()
+    active = np.ones(x.shape, dtype=bool)
+    for m in range(1, max_iter):
+        for coef in (m*(b - m)*x/((a + 2*m - 1)*(a + 2*m)),
+                     -(a + m)*(a + b + m)*x/((a + 2*m)*(a + 2*m + 1))):
+            d = 1 + coef*d
+            d = 1/np.where(np.abs(d) < tiny, tiny, d)
+            c = 1 + coef/c
+            c = np.where(np.abs(c) < tiny, tiny, c)
+            delta = np.where(active, c*d, 1.)
+            h *= delta
+        active &= np.abs(delta - 1) > 1e-15
+        if not active.any():
+            break
+    return h
+
+
+def _t_log_tail(log_t, df):
+    """
+    log of the survival function and of the density of the t distribution,
+    for t > 0 given by its log, also where they are too small to be floats
+
+    With x = df / (df + t^2), the survival function is I_x(df/2, 1/2) / 2
+    (regularized incomplete beta function), computed in log space with its
+    continued fraction. Close to the centre, where the fraction does not
+    converge, sst.t.logsf is used (it is then far from underflowing).
+    """
+    a = df/2
+    s = 2*log_t - np.log(df)
+    log_x = -np.logaddexp(0, s)
+    log_1mx = -np.logaddexp(0, -s)
+    x = np.exp(log_x)
+    tail = x < (a + 1)/(a + 2.5)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logsf = (a*log_x + .5*log_1mx - np.log(2*a) - ssp.betaln(a, .5)
+                 + np.log(_beta_fraction(a, .5, np.where(tail, x, 0.))))
+    if not tail.all():
+        logsf[~tail] = sst.t.logsf(np.exp(log_t[~tail]), df[~tail])
+    logpdf = (ssp.gammaln(a + .5) - ssp.gammaln(a) - .5*np.log(df*np.pi)
+              - (df + 1)/2*np.logaddexp(0, s))
+    return logsf, logpdf
+
+
+def t_isf_log(log_p, df):
+    """
+    sst.t.isf(exp(log_p), df), also for p-values too small to be a float
+
+    sst.t.isf loses accuracy, and can even return -inf, for tiny p-values
+    and few degrees of freedom. Below p = 1e-10, log(t) is found with Newton
+    steps on the log survival function, from the normal deviate (a lower
+    bound). t is inf if it is too large to be a float (eg df=1 and
+    p < 1e-308).
+    """
+    log_p, df = np.broadcast_arrays(np.asarray(log_p, dtype=float),
+                                    np.asarray(df, dtype=float))
+    small = np.isfinite(log_p) & (log_p < np.log(1e-10))
+    t = np.array(sst.t.isf(np.exp(np.where(small, -1., log_p)), df),
+                 dtype=float, ndmin=1)
+    if small.any():
+        lp, nu = log_p[small], df[small]
+        log_t = np.log(norm_isf_log(lp))
+        for _ in range(50):
+            logsf, logpdf = _t_log_tail(log_t, nu)
+            # d logsf / d log(t) = -t pdf / sf
+            step = (logsf - lp) / np.exp(log_t + logpdf - logsf)
+            log_t += step
+            if np.all(np.abs(step) < 1e-12):
+                break
+        with np.errstate(over='ignore'):
+            t[small.ravel()] = np.exp(log_t)
+    return t.reshape(log_p.shape)
+
+
+def back_calculate(p, n, test='z', sides=2, effects=(.2, .5, .8),
+                   alpha=0.05):
+    """
+    Test statistic, z, Cohen's d and design power of reported results
+    (vectorized)
+
+    Parameters:
+    -----------
+    p: array of float or str
+        The reported p-values
+    n: array of int
+        The total number of subjects (both groups for two-sample tests,
+        assumed of equal size)
+    test: str or array of str
+        'z', 'one-sample', 'paired' or 'two-sample' (t-tests)
+    sides: int or array of int
+        1 or 2, for one or two sided p-values. The effects are taken
+        positive
+    effects: list of float
+        The Cohen's d at which the power of each design is computed
+    alpha: float
+        The risk of error (type I) for the power, with the same sidedness
+        as the reported test
+
+    Returns:
+    --------
+    pandas DataFrame
+        Columns 'log10_p', 'statistic' (z or t), 'z' (the normal deviate
+        with the same one sided p-value), 'd' and 'power_<effect>' for
+        each effect
+    """
+    import pandas as pd
+
+    # all the columns have the shape of p and n broadcast, at least 1-d
+    log_p, n, test, sides = np.broadcast_arrays(
+        np.atleast_1d(log_pvalues(p)), np.asarray(n, dtype=float),
+        np.asarray(test, dtype=str), np.asarray(sides, dtype=int))
+    unknown = ~np.isin(test, TESTS)
+    if unknown.any():
+        raise ValueError("test has to be one of {}, got {}".format(
+            TESTS, np.unique(test[unknown])))
+
+    # one sided p-value
+    log_p1 = log_p - np.log(sides)
+    z = norm_isf_log(log_p1)
+    is_z = test == 'z'
+    two_sample = test == 'two-sample'
+    df = np.where(two_sample, n - 2, n - 1)
+    statistic = np.where(is_z, z, t_isf_log(log_p1, np.where(is_z, 1, df)))
+    # d = t sqrt(1/n1 + 1/n2) for two groups of n/2
+    d = statistic*np.where(two_sample, 2., 1.)/np.sqrt(n)
+
+    columns = {'log10_p': log_p/np.log(10), 'statistic': statistic, 'z': z,
+               'd': d}
+    two_sided = sides == 2
+    z_crit = sst.norm.isf(alpha/sides)
+    for effect in effects:
+        theta = effect*np.sqrt(n)
+        power = sst.norm.sf(z_crit - theta) + two_sided*sst.norm.cdf(-z_crit
+                                                                    - theta)
+        for sided in (1, 2):
+            paired = ~is_z & ~two_sample & (sides == sided)
+            if paired.any():
+                power[paired] = paired_power(n[paired], effect, 1., alpha,
+                                             two_sided=sided == 2)
+            both = two_sample & (sides == sided)
+            if both.any():
+                power[both] = two_sample_power(n[both]/2, n[both]/2, effect,
+                                               1., alpha,
+                                               two_sided=sided == 2)
+        columns['power_{:g}'.format(effect)] = power
+    return pd.DataFrame(columns)
+
+
+def back_calculate_csv(input_file, output_file, effects=(.2, .5, .8),
+                       alpha=0.05, chunksize=10000):
+    """
+    back_calculate for each row of a csv file, written to another csv file
+    chunk by chunk, so that the memory used does not depend on the number of
+    rows
+
+    The input file needs columns 'p' and 'n', and optionally 'test'
+    (default 'z') and 'sides' (default 2). The output file has the input
+    columns followed by the ones of back_calculate.
+
+    Returns:
+    --------
+    int
+        The number of rows processed
+    """
+    import pandas as pd
+
+    n_rows = 0
+    reader = pd.read_csv(input_file, dtype={'p': str}, chunksize=chunksize)
+    for i, chunk in enumerate(reader):
+        results = back_calculate(
+            chunk['p'].to_numpy(dtype=str), chunk['n'].to_numpy(),
+            chunk['test'].to_numpy(dtype=str) if 'test' in chunk else 'z',
+            chunk['sides'].to_numpy() if 'sides' in chunk else 2,
+            effects=effects, alpha=alpha)
+        results.index = chunk.index
+        pd.concat((chunk, results), axis=1).to_csv(
+            output_file, mode='w' if i == 0 else 'a', header=i == 0,
+            index=False)
+        n_rows += len(chunk)
+    return n_rows
+
+
+def parse_args():
+    """Parse command-line arguments."""
+
+    parser = OptionParser(usage="%prog [options] input.csv output.csv")
+    parser.add_option('-e', '--effects',
+                      default='.2,.5,.8',
+                      dest='effects',
+                      help='comma separated effect sizes for the power')
+    parser.add_option('-a', '--alpha',
+                      default=0.05, type='float',
+                      dest='alpha',
+                      help='risk of error (type I) for the power')
+    parser.add_option('-c', '--chunksize',
+                      default=10000, type='int',
+                      dest='chunksize',
+                      help='number of rows processed at once')
+
+    args, extras = parser.parse_args()
+    if len(extras) != 2:
+        parser.error('an input and an output file expected')
+    args.input_file, args.output_file = extras
+    args.effects = [float(e) for e in args.effects.split(',')]
+    return args
+
+
+def main():
+    """
+    Back-calculate the effect sizes of a csv file of reported results
+    """
+    args = parse_args()
+    n_rows = back_calculate_csv(args.input_file, args.output_file,
+                                effects=args.effects, alpha=args.alpha,
+                                chunksize=args.chunksize)
+    print("{} results written to {}".format(n_rows, args.output_file))
+
+
+if __name__ == '__main__':
+    main()
@@ -121,62 +121,10 @@ Image('./figures/johnson_PNAS_2013_significance.png')
 
 # $$ P\left( -t_{0.025}\hat\sigma/\sqrt{n} + \bar{Y}  \leq \mu \leq t_{0.025}\hat\sigma/\sqrt{n} + \bar{Y}   \right) = 0.05 $$ 
 
-def confidence_intervals(Nexp, CI = .95, **prmtrs):
-    """
-    Nexp: the number of experiments done
-    CI: confidence interval
-    
-    prmtrs: a dictionary with our parameters, 
-        example: prmtrs = {'n':16, 'mu':.3, 'sigma': 1., 'alpha': 0.05}
-        
-    returns arrays of size Nexp with:
-    effect: the estimated effect
-    detect: an array of 0 or 1, 1 when the effect is detected at alpha
-    lCI: lower bound of confidence interval
-    uCI: upper bound of confidence interval
-    """
-    # unpack parameters:
-    n = prmtrs['n']
-    mu = prmtrs['mu']; 
-    alpha = prmtrs['alpha']; 
-    sigma = prmtrs['sigma']
-    df = n-1
-    theta = mu*np.sqrt(n)/sigma
-    
-    # initialize arrays
-    t = np.zeros((Nexp,))
-    effect = np.zeros((Nexp,))
-    lCI = np.zeros((Nexp,))
-    uCI = np.zeros((Nexp,))
-
-    # compute random variables and thresholds
-    norv = sst.norm(0., sigma)
-    strv = sst.t(df)
-    # get the 0.05 t value *under the null* to construct confidence interval
-    
-    t_ci = strv.isf((1-CI)/2)
-    # get the alpha level t value *under the null* to detect 
-    t_alph = strv.isf(alpha)
-
-    for experim in range(Nexp):
-        # get n sample
-        sample = norv.rvs(size=(n,)) + mu
-        # effect and normalized effect size
-        effect[experim] = sample.mean()
-        std_error_data = np.std(sample, ddof=1) 
-        std_error_mean = std_error_data/np.sqrt(n) # np.std takes ddof as 
-                                                    # the df of freedom lost, here: 1.
-        t[experim] = effect[experim]/std_error_mean
-        # confidence interval :
-        CI_ = t_ci*std_error_mean
-        lCI[experim] = effect[experim] - CI_ # t_alph # 
-        uCI[experim] = effect[experim] + CI_ # t_alph # 
-
-    # number of detection:
-    detect = t>t_alph
-#    print 'number of detections:', xd.shape
-
-    return (effect, detect, lCI, uCI, t)
+# confidence_intervals simulates Nexp experiments of n subjects, all at once, and
+# returns for each one the effect, whether it is detected at alpha, the bounds of
+# its CI confidence interval and, with return_t=True, its t value
+from ttest_sims import confidence_intervals
 
 
 # +
@@ -190,7 +138,7 @@ print('Theta value %.3f \n' %theta)
 
 #--------------  simulate Nexp experiments ---------#
 Nexp = 1000
-effect, detect, lCI, uCI, t = confidence_intervals(Nexp, CI=.95, **prmtrs)
+effect, detect, lCI, uCI, t = confidence_intervals(Nexp, CI=.95, return_t=True, **prmtrs)
 print('Average t {:.3f} \n'.format(t.mean()))
 
 
@@ -215,12 +163,24 @@ print("-- over {} experiments".format(Nexp))
 print("-- percentage = {:.3f}".format(
       ((lCI>prmtrs['mu']).sum() + (uCI<prmtrs['mu']).sum())/Nexp))
 
+# +
+#--------------  same coverages from running counts, for many more experiments
+from ttest_sims import stream_coverage
+coverage = stream_coverage(10**7, CI=.95, chunk_size=10**6, sampler='sufficient', **prmtrs)
+coverage.summary()
+# -
+
+# +
+#--------------  expected detected effect, without simulation
+from winners_curse import expected_detected_effect, inflation
+print("Expected detected effect {:.3f}, inflation {:.2f}".format(
+      expected_detected_effect(**prmtrs), inflation(**prmtrs)))
+# -
+
+
 # +
 #--------------  plot ------------------------------#
 mu = prmtrs['mu']
-x = np.arange(Nexp)
-xd = np.arange(detect.sum())
-mu_line = np.ones((Nexp,))*prmtrs['mu']
 
 # print the number of lower confidence interval values that are above the true mean:
 # this should be about the risk of error/2
@@ -231,12 +191,9 @@ print(Nexp)
 # print "(lCI < 0 ", (lCI[detect] < 0).sum() / detect.sum()
 
 f = plt.figure(1).set_size_inches(12,4)
-lines = plt.plot(xd, lCI[detect], 'g-', 
-                 xd, effect[detect], 'b--',
-                 xd, uCI[detect], 'r-',
-                 xd, mu_line[detect], 'k');
-plt.legend( lines, ('lower_bound','detected Effect', 'Upper bound', 'True effect'), 
-                   loc='upper right', shadow=True)
+# one x per detected experiment, or min/max envelopes per pixel for large Nexp
+from ci_plots import plot_detected_intervals
+plot_detected_intervals(effect, detect, lCI, uCI, prmtrs['mu'])
 plt.xlabel(" One x is one experiment where detection occured", fontdict={'size':14})
 plt.ylabel(" Effect value and confidence interval ", fontdict={'size':14})
 plt.title(" Detected effects and their confidence interval", fontdict={'size':16});
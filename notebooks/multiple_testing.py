@@ -0,0 +1,167 @@
+"""
+Power of mass univariate studies (eg one t-test per voxel), when the
+familywise error rate or the false discovery rate is controlled, for the
+Power-basics notebook.
+
+m one sample t-tests are run, a fraction of them on true effects. With
+Bonferroni correction each test is done at alpha/m, and the power per test
+is stat_power at that threshold. The thresholds of Holm's and of the
+Benjamini-Hochberg procedures depend on the data, so their power is
+simulated.
+
+All the corrections only reject p-values below alpha, so a replication
+does not need all the m p-values: the number of null p-values below alpha
+is drawn from a binomial distribution, and these p-values are uniform on
+[0, alpha]. Only the p-values below alpha are computed, sorted and
+scanned: a replication of 10^6 tests takes milliseconds (a few tens when
+10^5 of them are true effects, whose p-values have to be computed).
+"""
+import numpy as np
+import scipy.stats as sst
+
+from power_analysis import stat_power
+from ttest_sims import check_random_state, critical_t
+
+METHODS = ('bonferroni', 'holm', 'bh')
+
+
+def n_rejected(sorted_p, m, alpha=0.05, method='bh'):
+    """
+    Number of hypotheses rejected by a multiple comparison procedure
+
+    Parameters:
+    -----------
+    sorted_p: 1D array
+        The smallest p-values of the m tests, sorted in increasing order.
+        They must include all the p-values below alpha
+    m: int
+        The total number of tests
+    alpha: float
+        The familywise error rate (bonferroni, holm) or the false discovery
+        rate (bh) controlled
+    method: str
+        'bonferroni', 'holm' or 'bh' (Benjamini-Hochberg)
+
+    Returns:
+    --------
+    int
+        The rejected hypotheses are the ones of the first p-values
+    """
+    rank = np.arange(sorted_p.size)
+    if method == 'bonferroni':
+        return int(np.searchsorted(sorted_p, alpha/m, side='right'))
+    elif method == 'holm':
+        # step down: stop at the first p-value above its threshold
+        above = sorted_p > alpha/(m - rank)
+        return int(np.argmax(above)) if above.any() else sorted_p.size
+    elif method == 'bh':
+        # step up: the largest rank below its threshold
+        below = np.flatnonzero(sorted_p <= alpha*(rank + 1)/m)
+        return int(below[-1] + 1) if below.size else 0
+    raise ValueError("method has to be one of {}, got {}".format(METHODS,
+                                                                 method))
+
+
+def _small_pvalues(m0, m1, n, theta, alpha, random_state):
+    """
+    The p-values below alpha of one replication, sorted, and whether each
+    one is a true effect
+    """
+    n_null = sst.binom(m0, alpha).rvs(random_state=random_state)
+    p_null = sst.uniform(0, alpha).rvs(size=n_null, random_state=random_state)
+    # t values of the true effects, from the mean and the variance
+    # (see ttest_sims.sample_experiments)
+    df = n - 1
+    z = sst.norm(theta, 1.).rvs(size=m1, random_state=random_state)
+    chi2 = sst.chi2(df).rvs(size=m1, random_state=random_state)
+    t = z/np.sqrt(chi2/df)
+    # the survival function is the costly part: only for p-values < alpha
+    p_effect = sst.t.sf(t[t >= critical_t(df, alpha)], df)
+
+    pvalues = np.concatenate((p_null, p_effect))
+    order = np.argsort(pvalues)
+    is_effect = np.arange(pvalues.size) >= p_null.size
+    return pvalues[order], is_effect[order]
+
+
+def mass_univariate_power(m=10**5, fraction=.1, n=16, mu=1., sigma=1.,
+                          alpha=0.05, n_reps=100, methods=METHODS,
+                          random_state=None):
+    """
+    Simulated power of m one sample t-tests under multiple comparison
+    control
+
+    Parameters:
+    -----------
+    m: int
+        The number of tests
+    fraction: float
+        The fraction of tests on a true effect
+    n: int
+        The number of subjects
+    mu, sigma: float
+        The true effect and the standard deviation of the data
+    alpha: float
+        The familywise error rate or the false discovery rate controlled
+    n_reps: int
+        The number of replications of the whole study
+    methods: list of str
+        Among 'bonferroni', 'holm' and 'bh'
+    random_state: None, int or numpy Generator
+        None uses the global numpy random state
+
+    Returns:
+    --------
+    pandas DataFrame
+        Indexed by method, with columns
+        'power': the average proportion of true effects detected
+        'mc_error': its Monte Carlo standard error
+        'any_power': the probability to detect at least one true effect
+        'fwer': the probability of at least one false positive
+        'fdr': the average proportion of false positives among detections
+    """
+    import pandas as pd
+
+    random_state = check_random_state(random_state)
+    m1 = int(round(fraction*m))
+    m0 = m - m1
+    theta = np.sqrt(n)*mu/sigma
+    power = np.zeros((n_reps, len(methods)))
+    false_positives = np.zeros((n_reps, len(methods)))
+    discoveries = np.zeros((n_reps, len(methods)))
+
+    for rep in range(n_reps):
+        sorted_p, is_effect = _small_pvalues(m0, m1, n, theta, alpha,
+                                             random_state)
+        cum_effects = np.concatenate(([0], np.cumsum(is_effect)))
+        for i, method in enumerate(methods):
+            rejected = n_rejected(sorted_p, m, alpha, method)
+            true_positives = cum_effects[rejected]
+            power[rep, i] = true_positives / max(m1, 1)
+            false_positives[rep, i] = rejected - true_positives
+            discoveries[rep, i] = rejected
+
+    return pd.DataFrame(
+        {'power': power.mean(axis=0),
+         'mc_error': power.std(axis=0, ddof=1)/np.sqrt(n_reps)
+         if n_reps > 1 else np.nan,
+         'any_power': (power > 0).mean(axis=0),
+         'fwer': (false_positives > 0).mean(axis=0),
+         'fdr': (false_positives / np.maximum(discoveries, 1)).mean(axis=0)},
+        index=pd.Index(methods, name='method'))
+
+
+def bonferroni_power(m=10**5, fraction=.1, n=16, mu=1., sigma=1.,
+                     alpha=0.05):
+    """
+    Power per test and probability to detect at least one of the true
+    effects with Bonferroni correction, without simulation (broadcast over
+    n, mu, sigma)
+
+    Returns:
+    --------
+    power, any_power: float or array
+    """
+    power = stat_power(n, mu, sigma, alpha/m)
+    m1 = np.round(fraction*m)
+    return power, 1 - (1 - np.asarray(power))**m1
@@ -0,0 +1,294 @@
+"""
+Polynomial fits of every degree at once, for the overfitting exercises.
+
+The P-value exercise fits a `PolynomialFeatures` + `LinearRegression`
+pipeline for each degree, and `cross_val_score` refits it for each fold.
+Here, the polynomial basis is orthogonalised once per fold with a QR
+factorisation: since the basis is nested (the first d+1 columns span the
+polynomials of degree d), the least squares fit of every degree comes out
+of the same factorisation.
+
+A Chebyshev basis on the rescaled input is used rather than the raw powers
+x, x^2, ... so that high degrees stay well conditioned: for degrees above
+~8 the errors can differ from the sklearn pipeline, whose fit on the raw
+powers loses precision.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from optparse import OptionParser
+
+import numpy as np
+
+
+def cv_folds(n_samples, cv=10):
+    """
+    Test indices of each fold, as `sklearn.model_selection.KFold(cv)`
+    (no shuffling) would give them
+
+    Returns:
+    --------
+    list of cv int arrays
+    """
+    return np.array_split(np.arange(n_samples), cv)
+
+
+def _basis(x, low, high, max_degree):
+    """ Chebyshev polynomials up to max_degree, with [low, high] -> [-1, 1] """
+    scaled = (2*x - (low + high)) / (high - low)
+    return np.polynomial.chebyshev.chebvander(scaled, max_degree)
+
+
+def _factorise(x_train, max_degree):
+    """
+    Chebyshev basis of the training inputs and its QR factorisation
+
+    It only depends on x, not on the predicted variable: all the targets
+    of polynomial_fits share it.
+    """
+    low, high = x_train.min(), x_train.max()
+    basis_train = _basis(x_train, low, high, max_degree)
+    # a polynomial of degree d is only determined by d + 1 distinct inputs
+    rank = min(max_degree + 1, np.unique(x_train).size)
+    q, r = np.linalg.qr(basis_train[:, :rank])
+    return basis_train, q, r, low, high
+
+
+def polynomial_fits(x_train, y_train, degrees, x_eval):
+    """
+    Least squares polynomial fits of x_train -> y_train, one per degree
+
+    Parameters:
+    -----------
+    x_train: 1D array
+        The training inputs
+    y_train: array of shape (n_train,) or (n_train, n_targets)
+        The predicted variable(s), all fitted with the same factorisation
+    degrees: list of int
+        The polynomial degrees
+    x_eval: 1D array
+        Where to evaluate the fitted polynomials
+
+    Returns:
+    --------
+    array of shape (len(degrees), len(x_eval)) (+ (n_targets,))
+        The fitted polynomial of each degree, evaluated at x_eval
+    """
+    degrees = np.asarray(degrees)
+    max_degree = int(degrees.max())
+    basis_train, q, r, low, high = _factorise(np.asarray(x_train, dtype=float),
+                                              max_degree)
+    basis_eval = _basis(x_eval, low, high, max_degree)
+
+    # one QR for all the degrees that have a unique fit: below the number
+    # of distinct training inputs
+    rank = r.shape[0]
+    coefs = q.T @ y_train
+    # the columns of basis_eval @ inv(r) are the orthonormal polynomials,
+    # evaluated at x_eval: partial sums give the fit of each degree
+    q_eval = np.linalg.solve(r.T, basis_eval[:, :rank].T).T
+    terms = q_eval.reshape(q_eval.shape + (1,)*(y_train.ndim - 1)) * coefs
+    partial_fits = np.cumsum(terms, axis=1)
+
+    fits = np.empty((degrees.size, x_eval.size) + y_train.shape[1:])
+    for i, degree in enumerate(degrees):
+        if degree < rank:
+            fits[i] = partial_fits[:, degree]
+        else:
+            # more coefficients than distinct inputs: no unique fit, take
+            # the least squares solution of minimum norm
+            coef_d = np.linalg.lstsq(basis_train[:, :degree + 1], y_train,
+                                     rcond=None)[0]
+            fits[i] = basis_eval[:, :degree + 1] @ coef_d
+    return fits
+
+
+def polynomial_degree_sweep(X, y, degrees, cv=10, X_eval=None):
+    """
+    Sample error and cross-validated error of a polynomial regression, for
+    all the degrees in one call
+
+    For low degrees, this gives the same errors as fitting, for each degree,
+    the pipeline `PolynomialFeatures(degree, include_bias=False)` +
+    `LinearRegression()` and calling `cross_val_score(pipeline, X, y,
+    cv=cv, scoring="neg_mean_squared_error")`, but the design is factorised
+    once per fold instead of once per (degree, fold). The errors differ
+    where the fit on the raw powers is ill-conditioned (from degree ~8 on 30
+    points in [0, 1]): the pipeline then loses the high order terms to
+    rounding, which acts as a regularisation, while the orthogonal basis
+    here gives the exact least squares polynomial, whose out of sample
+    error can be larger by orders of magnitude.
+
+    Parameters:
+    -----------
+    X: array of shape (n_samples,) or (n_samples, 1)
+        The input variable
+    y: array of shape (n_samples,) or (n_samples, 1)
+        The predicted variable
+    degrees: list of int
+        The polynomial degrees
+    cv: int
+        Number of folds
+    X_eval: None or array
+        If given, the polynomials fitted on all the data are evaluated there
+
+    Returns:
+    --------
+    train_mse: array of shape (len(degrees),)
+        Mean squared error on the data used for the fit
+    cv_mse: array of shape (cv, len(degrees))
+        Mean squared error on the left out data of each fold
+        (-scores of cross_val_score)
+    y_eval: None or array of shape (len(degrees), len(X_eval))
+        The fitted polynomials at X_eval
+    """
+    x = np.ravel(X).astype(float)
+    y = np.ravel(y).astype(float)
+
+    if X_eval is None:
+        fits = polynomial_fits(x, y, degrees, x)
+        y_eval = None
+    else:
+        x_eval = np.ravel(X_eval).astype(float)
+        fits = polynomial_fits(x, y, degrees, np.concatenate((x, x_eval)))
+        fits, y_eval = fits[:, :x.size], fits[:, x.size:]
+    train_mse = ((fits - y)**2).mean(axis=1)
+
+    cv_mse = np.empty((cv, len(degrees)))
+    for k, test in enumerate(cv_folds(x.size, cv)):
+        train = np.setdiff1d(np.arange(x.size), test)
+        fits = polynomial_fits(x[train], y[train], degrees, x[test])
+        cv_mse[k] = ((fits - y[test])**2).mean(axis=1)
+
+    return train_mse, cv_mse, y_eval
+
+
+def _fold_errors(job):
+    """
+    Mean squared errors of one (input variable, fold) job, for all the
+    targets and degrees. With test=None, the fit is on all the data and the
+    errors are the sample errors.
+    """
+    x, Y, test, degrees = job
+    if test is None:
+        fits = polynomial_fits(x, Y, degrees, x)
+        return ((fits - Y)**2).mean(axis=1)
+    train = np.setdiff1d(np.arange(x.size), test)
+    fits = polynomial_fits(x[train], Y[train], degrees, x[test])
+    return ((fits - Y[test])**2).mean(axis=1)
+
+
+def cross_validate_pairs(data, degrees, cv=10, inputs=None, targets=None,
+                         n_workers=None):
+    """
+    Polynomial regression of every target on every input variable of a
+    table, with the sample error and the cross-validated error of each
+    degree
+
+    The (input variable, fold) jobs are run in a process pool. Each job fits
+    all the targets and all the degrees from one factorisation of its
+    design (see polynomial_fits).
+
+    Parameters:
+    -----------
+    data: pandas DataFrame
+        eg brain_size.csv. Rows with a missing value in the variables used
+        are dropped
+    degrees: list of int
+        The polynomial degrees
+    cv: int
+        Number of folds
+    inputs, targets: None or list of str
+        The input and predicted variables, default to all the numeric columns
+    n_workers: int or None
+        The number of processes, defaults to the number of CPUs. With 1,
+        everything runs in the current process
+
+    Returns:
+    --------
+    pandas DataFrame
+        Indexed by (input, target, degree), with columns 'train_mse',
+        'cv_mse' and 'cv_std' (mean and standard deviation over the folds)
+    """
+    import pandas as pd
+
+    numeric = list(data.select_dtypes('number').columns)
+    inputs = numeric if inputs is None else list(inputs)
+    targets = numeric if targets is None else list(targets)
+    used = list(dict.fromkeys(inputs + targets))
+    table = data[used].dropna()
+    Y = table[targets].to_numpy(dtype=float)
+
+    folds = [None] + cv_folds(len(table), cv)
+    jobs = [(table[name].to_numpy(dtype=float), Y, test, degrees)
+            for name in inputs for test in folds]
+    if n_workers == 1:
+        errors = [_fold_errors(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            errors = list(executor.map(_fold_errors, jobs))
+    # (inputs, 1 + cv, degrees, targets)
+    errors = np.array(errors).reshape(len(inputs), len(folds), len(degrees),
+                                      len(targets))
+
+    rows = []
+    for i, x_name in enumerate(inputs):
+        for j, y_name in enumerate(targets):
+            if x_name == y_name:
+                continue
+            for d, degree in enumerate(degrees):
+                cv_mse = errors[i, 1:, d, j]
+                rows.append((x_name, y_name, degree, errors[i, 0, d, j],
+                             cv_mse.mean(), cv_mse.std()))
+    return pd.DataFrame(rows, columns=['input', 'target', 'degree',
+                                       'train_mse', 'cv_mse', 'cv_std']
+                        ).set_index(['input', 'target', 'degree'])
+
+
+def parse_args():
+    """Parse command-line arguments."""
+
+    parser = OptionParser(usage="%prog [options] data.csv")
+    parser.add_option('-d', '--degrees',
+                      default='1,4,15',
+                      dest='degrees',
+                      help='comma separated polynomial degrees')
+    parser.add_option('-c', '--cv',
+                      default=10, type='int',
+                      dest='cv',
+                      help='number of folds')
+    parser.add_option('-w', '--workers',
+                      default=None, type='int',
+                      dest='n_workers',
+                      help='number of processes')
+    parser.add_option('-o', '--output',
+                      default=None,
+                      dest='output',
+                      help='write the results to this csv file')
+
+    args, extras = parser.parse_args()
+    if len(extras) != 1:
+        parser.error('one data file expected')
+    args.data_file = extras[0]
+    args.degrees = [int(d) for d in args.degrees.split(',')]
+    return args
+
+
+def main():
+    """
+    Cross-validate polynomial regressions of every pair of variables of a
+    csv file, eg `python overfitting.py brain_size.csv -d 1,2,3,4`
+    """
+    import pandas as pd
+
+    args = parse_args()
+    data = pd.read_csv(args.data_file, sep=None, engine='python',
+                       index_col=0, na_values='.')
+    results = cross_validate_pairs(data, args.degrees, cv=args.cv,
+                                   n_workers=args.n_workers)
+    if args.output is None:
+        print(results.to_string())
+    else:
+        results.to_csv(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Simulations of p-hacking strategies, used with the P-value exercise.
+
+Each strategy takes a block of experiments simulated under the null
+(data are N(0, 1)) and tells for each one whether the p-hacker ends up
+reporting a significant result. `phacking_rate` runs a strategy over
+millions of replications, chunk by chunk, and returns the false positive
+rate it actually produces.
+"""
+import numpy as np
+import scipy.stats as sst
+
+from ttest_sims import check_random_state, critical_t
+
+
+def _t_values(sums, sums_sq, counts):
+    """ one sample t values from sums, sums of squares and counts """
+    mean = sums / counts
+    var = (sums_sq - counts*mean**2) / (counts - 1)
+    return mean / np.sqrt(var/counts)
+
+
+def _critical_t(df, alpha):
+    """ critical_t for an array of degrees of freedom """
+    df = np.asarray(df)
+    values, inverse = np.unique(df, return_inverse=True)
+    crit = np.array([critical_t(int(d), alpha) for d in values])
+    return crit[inverse].reshape(df.shape)
+
+
+def honest(size, n=30, alpha=0.05, random_state=None):
+    """
+    No p-hacking: one sided t-test on n subjects, for reference
+    """
+    samples = sst.norm(0, 1).rvs(size=(size, n), random_state=random_state)
+    t = _t_values(samples.sum(axis=1), (samples**2).sum(axis=1), n)
+    return t >= critical_t(n-1, alpha)
+
+
+def optional_stopping(size, n_min=10, n_max=50, k=5, alpha=0.05,
+                      random_state=None):
+    """
+    Test after n_min subjects, then again every k new subjects until n_max,
+    and stop as soon as the test is significant
+
+    The t value at each peek is computed from cumulative sums of the data
+    and of their squares, so that a peek does not recompute the previous
+    subjects.
+    """
+    samples = sst.norm(0, 1).rvs(size=(size, n_max), random_state=random_state)
+    peeks = np.arange(n_min, n_max + 1, k)
+    sums = np.cumsum(samples, axis=1)[:, peeks - 1]
+    sums_sq = np.cumsum(samples**2, axis=1)[:, peeks - 1]
+    t = _t_values(sums, sums_sq, peeks)
+    return (t >= _critical_t(peeks - 1, alpha)).any(axis=1)
+
+
+def outlier_trimming(size, n=30, z=2., alpha=0.05, random_state=None):
+    """
+    Test the data, and if it is not significant, drop the subjects further
+    than z standard deviations from the mean and test again
+    """
+    samples = sst.norm(0, 1).rvs(size=(size, n), random_state=random_state)
+    mean = samples.mean(axis=1, keepdims=True)
+    std = samples.std(axis=1, ddof=1, keepdims=True)
+    keep = np.abs(samples - mean) <= z*std
+
+    t_all = _t_values(samples.sum(axis=1), (samples**2).sum(axis=1), n)
+    counts = keep.sum(axis=1)
+    t_trim = _t_values((samples*keep).sum(axis=1),
+                       (samples**2*keep).sum(axis=1), counts)
+    return ((t_all >= critical_t(n-1, alpha))
+            | (t_trim >= _critical_t(counts - 1, alpha)))
+
+
+def multiple_outcomes(size, n=30, m=5, rho=.5, alpha=0.05,
+                      random_state=None):
+    """
+    Measure m outcomes (dependent variables) with correlation rho between
+    them, and report the one that gives a significant test, if any
+    """
+    random_state = check_random_state(random_state)
+    norv = sst.norm(0, 1)
+    common = norv.rvs(size=(size, 1, n), random_state=random_state)
+    specific = norv.rvs(size=(size, m, n), random_state=random_state)
+    samples = np.sqrt(rho)*common + np.sqrt(1 - rho)*specific
+    t = _t_values(samples.sum(axis=2), (samples**2).sum(axis=2), n)
+    return (t >= critical_t(n-1, alpha)).any(axis=1)
+
+
+def switch_sidedness(size, n=30, alpha=0.05, random_state=None):
+    """
+    Plan a two sided test, and if it is not significant, report a one
+    sided test in the direction of the observed effect
+    """
+    samples = sst.norm(0, 1).rvs(size=(size, n), random_state=random_state)
+    t = _t_values(samples.sum(axis=1), (samples**2).sum(axis=1), n)
+    two_sided = np.abs(t) >= critical_t(n-1, alpha/2)
+    one_sided = np.abs(t) >= critical_t(n-1, alpha)
+    return two_sided | one_sided
+
+
+STRATEGIES = {'honest': honest,
+              'optional_stopping': optional_stopping,
+              'outlier_trimming': outlier_trimming,
+              'multiple_outcomes': multiple_outcomes,
+              'switch_sidedness': switch_sidedness}
+
+
+def phacking_rate(strategy, n_reps=10**6, batch_size=10**5,
+                  random_state=None, **kwargs):
+    """
+    False positive rate of a p-hacking strategy when the null is true
+
+    Parameters:
+    -----------
+    strategy: str or function
+        A name in STRATEGIES, or a function with the same signature
+    n_reps: int
+        The number of replications
+    batch_size: int
+        The number of replications simulated at once
+    random_state: None, int or numpy Generator
+        None uses the global numpy random state
+    kwargs:
+        Parameters of the strategy, eg `k=5` for optional_stopping
+
+    Returns:
+    --------
+    rate: float
+        The proportion of replications reported as significant
+    mc_error: float
+        The Monte Carlo standard error of rate
+    """
+    if not callable(strategy):
+        if strategy not in STRATEGIES:
+            raise ValueError("strategy has to be one of {}, got {}".format(
+                list(STRATEGIES), strategy))
+        strategy = STRATEGIES[strategy]
+    random_state = check_random_state(random_state)
+
+    number_significant = 0
+    for start in range(0, n_reps, batch_size):
+        size = min(batch_size, n_reps - start)
+        number_significant += int(strategy(size, random_state=random_state,
+                                           **kwargs).sum())
+    rate = number_significant / n_reps
+    return rate, float(np.sqrt(rate*(1 - rate)/n_reps))
+
+
+def compare_strategies(n_reps=10**6, alpha=0.05, random_state=None):
+    """
+    Print the false positive rate of each strategy in STRATEGIES, with its
+    default parameters
+    """
+    random_state = check_random_state(random_state)
+    rates = {}
+    for name in STRATEGIES:
+        rate, mc_error = phacking_rate(name, n_reps, alpha=alpha,
+                                       random_state=random_state)
+        print("{:<20} false positive rate {:.4f} (+/- {:.4f})".format(
+            name, rate, mc_error))
+        rates[name] = rate
+    return rates
@@ -0,0 +1,514 @@
+"""
+Statistical power of the one sample t-test, for the Power-basics and
+Misconceptions-Confidence-Intervals notebooks, and of the paired, two
+sample and one way ANOVA designs.
+
+All the functions broadcast over their arguments, so that a whole power
+surface (eg, power as a function of the number of subjects and of the
+effect) is computed with one call instead of a Python loop over the grid.
+"""
+import hashlib
+import math
+import os
+import tempfile
+
+import numpy as np
+import scipy.stats as sst
+
+
+def _scalar_or_array(x):
+    """ return a float for 0-d results, the array otherwise """
+    return float(x) if np.ndim(x) == 0 else x
+
+
+def stat_power(n=16, mu=1., sigma=1., alpha=0.05):
+    """
+    This function computes the statistical power of an analysis assuming a normal
+    distribution of the data with a one sample t-test
+
+    All the parameters can be arrays, they are broadcast against each other:
+    eg `stat_power(nses[np.newaxis, :], muse[:, np.newaxis])` is the power
+    for each effect (rows) and each number of subjects (columns).
+
+    Parameters:
+    -----------
+    n: int or array of int
+        The number of sample in the experiment
+    mu: float or array
+        The mean of the alternative
+    sigma: float or array
+        The standard deviation of the alternative
+    alpha: float or array
+        The risk of error (type I)
+
+    Returns:
+    --------
+    float or array
+        The statistical power for this number of sample, mu, sigma, alpha
+    """
+    n = np.asarray(n)
+    df = n - 1
+    theta = np.sqrt(n)*np.asarray(mu)/np.asarray(sigma)
+    # the critical values only have the broadcast shape of (alpha, df),
+    # usually much smaller than the whole grid
+    t_alph_null = sst.t.isf(alpha, df)
+    spow = sst.nct.sf(t_alph_null, df, theta)
+    return _scalar_or_array(spow)
+
+
+def power_curves(muse, nses, sigma=1., alpha=0.05, tol=None):
+    """
+    Power as a function of the number of subjects, for each effect size
+
+    The critical t values are computed once per number of subjects, and
+    shared by all the effect sizes.
+
+    Parameters:
+    -----------
+    muse: array of float
+        The effect sizes (means of the alternative)
+    nses: array of int
+        The numbers of subjects
+    sigma: float
+        The standard deviation of the data
+    alpha: float
+        The risk of error (type I)
+    tol: None or float
+        If given, the power is computed with tiered_power, with this
+        maximum error (eg 1e-4 is well below a pixel on a plot)
+
+    Returns:
+    --------
+    array of shape (len(muse), len(nses))
+    """
+    nses = np.asarray(nses)
+    if tol is not None:
+        return tiered_power(nses[np.newaxis, :],
+                            np.asarray(muse)[:, np.newaxis], sigma, alpha,
+                            tol=tol)[0]
+    df = nses - 1
+    t_alph_null = sst.t.isf(alpha, df)
+    theta = (np.sqrt(nses)[np.newaxis, :]
+             * np.asarray(muse, dtype=float)[:, np.newaxis] / sigma)
+    return sst.nct.sf(t_alph_null, df, theta)
+
+
+def normal_approx_power(n=16, mu=1., sigma=1., alpha=0.05):
+    """
+    Power of the one sample t-test with the normal approximation of the
+    noncentral t distribution (Abramowitz and Stegun 26.7.10)
+
+        P(t > c) ~ P(Z > (c (1 - 1/(4 df)) - theta) / sqrt(1 + c^2 / (2 df)))
+
+    Returns:
+    --------
+    power: float or array
+    bound: float or array
+        A bound on the absolute error, 0.01 (1 + c^2)^2 / df^2. The error of
+        the approximation decreases as 1/df^2; the constant was checked
+        numerically for 20 <= df <= 3000, 1e-8 <= alpha <= 0.5 and all
+        theta (largest observed ratio 0.006). For df < 20 the bound is inf.
+    """
+    n = np.asarray(n)
+    df = n - 1
+    theta = np.sqrt(n)*np.asarray(mu)/np.asarray(sigma)
+    c = sst.t.isf(alpha, df)
+    z = (c*(1 - 1/(4*df)) - theta) / np.sqrt(1 + c**2/(2*df))
+    bound = np.where(df >= 20, 0.01*(1 + c**2)**2/df**2, np.inf)
+    return _scalar_or_array(sst.norm.sf(z)), _scalar_or_array(bound)
+
+
+def tiered_power(n=16, mu=1., sigma=1., alpha=0.05, tol=1e-6):
+    """
+    stat_power, using the cheap normal approximation wherever its a priori
+    error bound is below tol (eg, large n), and the exact noncentral t
+    elsewhere
+
+    Parameters:
+    -----------
+    n, mu, sigma, alpha: as in stat_power (broadcast)
+    tol: float
+        The maximum absolute error accepted on the power
+
+    Returns:
+    --------
+    power: float or array
+    tiers: dict
+        The number of points computed with each tier, {'normal': ...,
+        'exact': ...}
+    """
+    n, mu, sigma, alpha = np.broadcast_arrays(n, mu, sigma, alpha)
+    spow, bound = normal_approx_power(n, mu, sigma, alpha)
+    spow, bound = np.array(spow, ndmin=1), np.array(bound, ndmin=1)
+    exact = bound > tol
+    if exact.any():
+        spow[exact] = stat_power(*(np.array(x, ndmin=1)[exact]
+                                   for x in (n, mu, sigma, alpha)))
+    tiers = {'normal': int((~exact).sum()), 'exact': int(exact.sum())}
+    return _scalar_or_array(spow.reshape(n.shape)), tiers
+
+
+def _t_power(df, theta, alpha, two_sided=False):
+    """ power of a t-test with df degrees of freedom and noncentrality theta """
+    if not two_sided:
+        return sst.nct.sf(sst.t.isf(alpha, df), df, theta)
+    t_crit = sst.t.isf(np.asarray(alpha)/2, df)
+    # P(T < -t_crit) as the upper tail of -T: nct.cdf returns nan far in
+    # the lower tail
+    return sst.nct.sf(t_crit, df, theta) + sst.nct.sf(t_crit, df, -theta)
+
+
+def paired_power(n=16, mu=1., sigma=1., alpha=0.05, rho=None,
+                 two_sided=False):
+    """
+    Statistical power of a paired t-test (broadcast)
+
+    Parameters:
+    -----------
+    n: int or array of int
+        The number of pairs
+    mu: float or array
+        The mean difference between the two conditions
+    sigma: float or array
+        With rho=None, the standard deviation of the differences (the
+        test is then the one sample t-test of stat_power). Otherwise, the
+        standard deviation of each condition
+    alpha: float or array
+        The risk of error (type I)
+    rho: None, float or array
+        The correlation between the two measures of a pair
+    two_sided: bool
+
+    Returns:
+    --------
+    float or array
+    """
+    n = np.asarray(n)
+    sigma = np.asarray(sigma)
+    if rho is not None:
+        sigma = sigma*np.sqrt(2*(1 - np.asarray(rho)))
+    theta = np.sqrt(n)*np.asarray(mu)/sigma
+    return _scalar_or_array(_t_power(n - 1, theta, alpha, two_sided))
+
+
+def two_sample_power(n1=16, n2=16, mu=1., sigma=1., alpha=0.05,
+                     sigma2=None, two_sided=False):
+    """
+    Statistical power of an independent two sample t-test (broadcast)
+
+    With sigma2=None, the groups have the same standard deviation sigma and
+    the test is Student's t-test (pooled variance, n1 + n2 - 2 degrees of
+    freedom). Otherwise the test is Welch's t-test, and the power is the
+    usual approximation with the Welch-Satterthwaite degrees of freedom of
+    the true variances.
+
+    Parameters:
+    -----------
+    n1, n2: int or array of int
+        The size of each group
+    mu: float or array
+        The difference between the means of the groups
+    sigma: float or array
+        The standard deviation of the first group (of both if sigma2 is None)
+    alpha: float or array
+        The risk of error (type I)
+    sigma2: None, float or array
+        The standard deviation of the second group
+    two_sided: bool
+
+    Returns:
+    --------
+    float or array
+    """
+    n1, n2 = np.asarray(n1), np.asarray(n2)
+    var1 = np.asarray(sigma)**2 / n1
+    if sigma2 is None:
+        var2 = np.asarray(sigma)**2 / n2
+        df = n1 + n2 - 2
+    else:
+        var2 = np.asarray(sigma2)**2 / n2
+        df = (var1 + var2)**2 / (var1**2/(n1 - 1) + var2**2/(n2 - 1))
+    theta = np.asarray(mu) / np.sqrt(var1 + var2)
+    return _scalar_or_array(_t_power(df, theta, alpha, two_sided))
+
+
+def anova_power(k=3, n=16, f=.25, alpha=0.05):
+    """
+    Statistical power of a one way ANOVA with k groups of n subjects
+    (broadcast)
+
+    The F statistic follows a noncentral F distribution with k - 1 and
+    k (n - 1) degrees of freedom and noncentrality k n f^2.
+
+    Parameters:
+    -----------
+    k: int or array of int
+        The number of groups
+    n: int or array of int
+        The number of subjects per group
+    f: float or array
+        Cohen's f effect size, the standard deviation of the group means
+        (over the groups, ddof=0) divided by the within group standard
+        deviation
+    alpha: float or array
+        The risk of error (type I)
+
+    Returns:
+    --------
+    float or array
+    """
+    k, n = np.asarray(k), np.asarray(n)
+    dfn, dfd = k - 1, k*(n - 1)
+    f_crit = sst.f.isf(alpha, dfn, dfd)
+    return _scalar_or_array(sst.ncf.sf(f_crit, dfn, dfd,
+                                       k*n*np.asarray(f)**2))
+
+
+def n_power(pw=.8, mu=1., sigma=1., alpha=0.05):
+    """
+    compute the number of subjects needed to get pw given
+    mu, sigma and alpha, with the normal approximation (broadcast)
+
+    This underestimates n for small samples, see sample_size for the exact
+    number.
+    """
+    ta = sst.norm.isf(alpha)
+    tb = sst.norm.isf(pw)
+    return _scalar_or_array((np.asarray(sigma)*(ta - tb)/np.asarray(mu))**2)
+
+
+def sample_size(pw=.8, mu=1., sigma=1., alpha=0.05):
+    """
+    Smallest number of subjects for which the one sample t-test has a power
+    of at least pw (exact computation with the noncentral t)
+
+    All the parameters are broadcast. The search starts from the normal
+    approximation n_power, corrected for the t distribution, and checks
+    its neighbour. In the few other cases, it looks for an n that is large
+    enough by doubling the step, then bisects. Each step evaluates
+    stat_power on the designs that are not solved yet only.
+
+    Parameters:
+    -----------
+    pw: float or array
+        The target power, between alpha and 1
+    mu: float or array
+        The mean of the alternative, > 0
+    sigma: float or array
+        The standard deviation of the data
+    alpha: float or array
+        The risk of error (type I)
+
+    Returns:
+    --------
+    int or int array
+        The number of subjects
+    """
+    shape = np.broadcast(pw, mu, sigma, alpha).shape
+    pw, mu, sigma, alpha = (np.ravel(x) for x in
+                            np.broadcast_arrays(pw, mu, sigma, alpha))
+    if (mu <= 0).any() or (pw <= alpha).any() or (pw >= 1).any():
+        raise ValueError("need mu > 0 and alpha < pw < 1")
+
+    # warm start: normal approximation, with Guenther's (1981) correction
+    # for the t distribution, which is most of the time exact or one short
+    start = n_power(pw, mu, sigma, alpha) + sst.norm.isf(alpha)**2/2
+    start = np.maximum(np.ceil(start), 2).astype(int)
+    # lo: too small (or 1, with no degree of freedom), hi: large enough
+    lo = np.ones_like(start)
+    hi = np.zeros_like(start)
+    enough = stat_power(start, mu, sigma, alpha) >= pw
+    lo[~enough] = start[~enough]
+    hi[enough] = start[enough]
+    # most of the time, start - 1 is not enough and start is the answer
+    check = np.flatnonzero(enough & (start > 2))
+    below = stat_power(start[check] - 1, mu[check], sigma[check],
+                       alpha[check]) >= pw[check]
+    lo[check[~below]] = start[check[~below]] - 1
+    hi[check[below]] = start[check[below]] - 1
+
+    # gallop up from the warm start until the power is reached
+    step = np.ones_like(start)
+    todo = np.flatnonzero(hi == 0)
+    while todo.size:
+        candidate = lo[todo] + step[todo]
+        ok = stat_power(candidate, mu[todo], sigma[todo], alpha[todo]) >= pw[todo]
+        hi[todo[ok]] = candidate[ok]
+        lo[todo[~ok]] = candidate[~ok]
+        step[todo[~ok]] *= 2
+        todo = todo[~ok]
+
+    # bisect: power(lo) < pw <= power(hi)
+    todo = np.flatnonzero(hi - lo > 1)
+    while todo.size:
+        mid = (lo[todo] + hi[todo]) // 2
+        ok = (mid >= 2) & (stat_power(np.maximum(mid, 2), mu[todo], sigma[todo],
+                                      alpha[todo]) >= pw[todo])
+        hi[todo[ok]] = mid[ok]
+        lo[todo[~ok]] = mid[~ok]
+        todo = todo[hi[todo] - lo[todo] > 1]
+
+    hi = hi.reshape(shape)
+    return int(hi) if hi.ndim == 0 else hi
+
+
+def _power_df_theta(df, theta, alpha):
+    """ power as a function of the degrees of freedom and noncentrality """
+    return sst.nct.sf(sst.t.isf(alpha, df), df, theta)
+
+
+class PowerTable(object):
+    """
+    Precomputed power over a grid of (alpha, df, theta), kept on disk
+
+    The table is stored as a .npy file in cache_dir, named after a hash of
+    the grid definition: it is computed the first time a grid is used, and
+    then memory-mapped by every later PowerTable with the same grid (eg,
+    when a notebook is re-run). Computing it is not free: the default grid
+    (4 alphas x 500 dfs x 2401 thetas) takes about 10 s and 38 MB on disk.
+    It is done at the first lookup that needs the table, not when the
+    PowerTable is created.
+
+    A lookup of one design (scalar arguments, as from a slider) reads the
+    two neighbouring values in the table directly, in a few microseconds.
+
+    Power is increasing in the noncentrality theta, so between two grid
+    points the exact power is between the two tabulated values: linear
+    interpolation in theta is monotone, and its error is at most the
+    difference between the two values. Points whose bound is above the
+    requested tolerance, or which are outside the grid (df not tabulated,
+    alpha not tabulated, theta out of range), are computed exactly.
+
+    Parameters:
+    -----------
+    dfs: array of int
+        The tabulated degrees of freedom (n-1)
+    theta_range: (float, float, int)
+        (min, max, number of points) of the uniform grid of noncentrality
+        parameters theta = sqrt(n)*mu/sigma
+    alphas: list of float
+        The tabulated type I risks
+    cache_dir: str or None
+        Where the tables are stored, default ~/.cache/power_tables
+    """
+    def __init__(self, dfs=np.arange(1, 501), theta_range=(-4., 20., 2401),
+                 alphas=(0.05, 0.01, 0.005, 0.001), cache_dir=None):
+        self.dfs = np.asarray(dfs, dtype=int)
+        self.theta_min, self.theta_max, self.n_theta = theta_range
+        self.thetas = np.linspace(*theta_range)
+        self.step = self.thetas[1] - self.thetas[0]
+        self.alphas = np.asarray(alphas, dtype=float)
+        # positions in the grid, for the lookups of one design
+        self._df_index = dict((int(df), i) for i, df in enumerate(self.dfs))
+        self._alpha_index = dict((float(a), i)
+                                 for i, a in enumerate(self.alphas))
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.expanduser('~'), '.cache',
+                                     'power_tables')
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir,
+                                 'power_{}.npy'.format(self.grid_hash()))
+        self._values = None
+
+    @property
+    def values(self):
+        """ the (alpha, df, theta) table, computed on first use """
+        if self._values is None:
+            if not os.path.exists(self.path):
+                self._build()
+            # a plain array view of the map: indexing an np.memmap costs
+            # more than the lookup itself
+            self._values = np.load(self.path, mmap_mode='r').view(np.ndarray)
+        return self._values
+
+    def grid_hash(self):
+        """ a hash of the grid definition, to name the cached table """
+        sha = hashlib.sha1()
+        for x in (self.dfs.astype('<i8'), self.thetas.astype('<f8'),
+                  self.alphas.astype('<f8')):
+            sha.update(x.tobytes())
+        return sha.hexdigest()[:16]
+
+    def _build(self):
+        """ compute the table and save it (atomically) to self.path """
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        values = _power_df_theta(self.dfs[np.newaxis, :, np.newaxis],
+                                 self.thetas[np.newaxis, np.newaxis, :],
+                                 self.alphas[:, np.newaxis, np.newaxis])
+        handle, tmp_path = tempfile.mkstemp(dir=self.cache_dir,
+                                            suffix='.npy')
+        with os.fdopen(handle, 'wb') as f:
+            np.save(f, values)
+        os.replace(tmp_path, self.path)
+
+    def power(self, n=16, mu=1., sigma=1., alpha=0.05, tol=5e-3,
+              return_bound=False):
+        """
+        Power of the one sample t-test, as stat_power, from the table
+
+        Parameters:
+        -----------
+        n, mu, sigma, alpha: as in stat_power (broadcast)
+        tol: float
+            Maximum error accepted for an interpolated value
+        return_bound: bool
+            Also return the bound on the error of each value (0 where the
+            power was computed exactly)
+
+        Returns:
+        --------
+        power: float or array
+        bound: float or array, if return_bound
+        """
+        if all(np.isscalar(x) for x in (n, mu, sigma, alpha)):
+            spow, bound = self._scalar_power(n, mu, sigma, alpha, tol)
+            return (spow, bound) if return_bound else spow
+
+        n, mu, sigma, alpha = np.broadcast_arrays(n, mu, sigma, alpha)
+        shape = n.shape
+        n, mu, sigma, alpha = (np.ravel(x) for x in (n, mu, sigma, alpha))
+        df = (n - 1).astype(int)
+        theta = np.sqrt(n)*mu/sigma
+
+        i_df = np.clip(np.searchsorted(self.dfs, df), 0, self.dfs.size - 1)
+        i_alpha = np.abs(alpha[..., np.newaxis] - self.alphas).argmin(axis=-1)
+        in_grid = ((self.dfs[i_df] == df)
+                   & np.isclose(self.alphas[i_alpha], alpha, rtol=1e-12,
+                                atol=0)
+                   & (theta >= self.theta_min) & (theta <= self.theta_max))
+
+        position = (theta - self.theta_min) / self.step
+        i_theta = np.clip(np.floor(np.where(in_grid, position, 0)).astype(int),
+                          0, self.n_theta - 2)
+        low = self.values[i_alpha, i_df, i_theta]
+        high = self.values[i_alpha, i_df, i_theta + 1]
+        weight = position - i_theta
+        spow = low + weight*(high - low)
+        bound = np.where(in_grid, high - low, np.inf)
+
+        exact = bound > tol
+        if exact.any():
+            spow[exact] = _power_df_theta(df[exact], theta[exact], alpha[exact])
+            bound[exact] = 0.
+
+        spow, bound = spow.reshape(shape), bound.reshape(shape)
+        if return_bound:
+            return _scalar_or_array(spow), _scalar_or_array(bound)
+        return _scalar_or_array(spow)
+
+    def _scalar_power(self, n, mu, sigma, alpha, tol):
+        """ power and error bound of one design, without numpy overhead """
+        df = int(n) - 1
+        theta = math.sqrt(n)*mu/sigma
+        i_df = self._df_index.get(df)
+        i_alpha = self._alpha_index.get(float(alpha))
+        if (i_df is not None and i_alpha is not None
+                and self.theta_min <= theta <= self.theta_max):
+            position = (theta - self.theta_min) / self.step
+            i_theta = min(int(position), self.n_theta - 2)
+            low = float(self.values[i_alpha, i_df, i_theta])
+            high = float(self.values[i_alpha, i_df, i_theta + 1])
+            if high - low <= tol:
+                return low + (position - i_theta)*(high - low), high - low
+        return float(_power_df_theta(df, theta, alpha)), 0.
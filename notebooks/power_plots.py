@@ -0,0 +1,270 @@
+"""
+Plots of the H0 and H1 sampling densities of the one sample t-test, with the
+rejected region under H1 (the power) shaded, for Power-basics and
+Misconceptions-Confidence-Intervals.
+
+`plot_power_curves` draws power as a function of the number of subjects for
+many effect sizes as a single LineCollection.
+
+`PowerPlot` creates its lines, shaded polygon and text once, and `update`
+only changes their data: the same figure can render a whole sequence of
+(n, mu, sigma) frames, on screen with `animate` (blitting) or to image files
+with `save_frames`.
+"""
+import matplotlib.pyplot as plt
+import numpy as np
+import scipy.stats as sst
+from matplotlib.animation import FuncAnimation
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+from matplotlib.patches import Polygon
+
+from power_analysis import power_curves
+
+
+def _x_bounds(n, mu, sigma):
+    """
+    The plotted t range: from the 0.1% quantile of the H0 normal to the
+    99.9% quantile of the H1 noncentral t (broadcast over the arguments)
+    """
+    n = np.asarray(n)
+    theta = np.sqrt(n)*np.asarray(mu)/np.asarray(sigma)
+    low = np.minimum(sst.norm.isf(.999), sst.nct.isf(.999, n - 1, theta))
+    high = np.maximum(sst.norm.isf(.001), sst.nct.isf(.001, n - 1, theta))
+    return low, high
+
+
+class PowerPlot(object):
+    """
+    H0 / H1 densities figure whose artists are reused from frame to frame
+
+    Parameters:
+    -----------
+    ax: None or matplotlib Axes
+        Where to draw, a new figure is created if None
+    alpha: float
+        The risk of error (type I), used when a frame does not give one
+    xlen: int
+        Number of points for the display
+    xlim: None or (float, float)
+        Fixed t range. If None, each frame is plotted on its own range
+        (as the original plot_power)
+    ylim: (float, float)
+        The densities never go above the N(0, 1) peak, ~0.4
+    """
+    def __init__(self, ax=None, alpha=0.05, xlen=500, xlim=None,
+                 ylim=(0., .45)):
+        if ax is None:
+            fig, ax = plt.subplots()
+        self.ax = ax
+        self.alpha = alpha
+        self.xlen = xlen
+        self.xlim = xlim
+
+        self.h1_line, = ax.plot([], [], 'g')
+        self.h0_line, = ax.plot([], [], 'b')
+        self.t_line, = ax.plot([], [], 'r')
+        # http://matplotlib.org/xkcd/examples/showcase/integral_demo.html
+        self.shade = Polygon(np.zeros((2, 2)), facecolor='0.9',
+                             edgecolor='0.5')
+        ax.add_patch(self.shade)
+        # the title and the labels are outside the axes and would not be
+        # redrawn when blitting: n, the power, theta and mu are written inside
+        self.info = ax.text(.02, .95, '', transform=ax.transAxes,
+                            va='top')
+        ax.set_ylim(*ylim)
+        if xlim is not None:
+            ax.set_xlim(*xlim)
+        ax.set_xlabel("t-value - H1 centred on " + r"$\theta $")
+        ax.set_ylabel("Probability(t)")
+        ax.set_title('H0 and H1 sampling densities')
+
+    @property
+    def artists(self):
+        """ the artists changed by update, in drawing order """
+        return (self.shade, self.h1_line, self.h0_line, self.t_line,
+                self.info)
+
+    def update(self, n=16, mu=1., sigma=1., alpha=None):
+        """
+        Redraw the densities for a new (n, mu, sigma, alpha)
+
+        Returns:
+        --------
+        float
+            The statistical power
+        """
+        alpha = self.alpha if alpha is None else alpha
+        df = n-1
+        theta = np.sqrt(n)*mu/sigma
+        t_alph_null = sst.t.isf(alpha, df)
+        spow = sst.nct.sf(t_alph_null, df, theta)
+
+        if self.xlim is None:
+            low, high = _x_bounds(n, mu, sigma)
+            self.ax.set_xlim(low, high)
+        else:
+            low, high = self.xlim
+        x = np.linspace(low, high, self.xlen)
+        # each density once for the frame
+        h1_pdf = sst.nct.pdf(x, df, theta)
+        h0_pdf = sst.norm.pdf(x)
+
+        self.h1_line.set_data(x, h1_pdf)
+        self.h0_line.set_data(x, h0_pdf)
+        t_index = min(np.searchsorted(x, t_alph_null), self.xlen - 1)
+        t_x = x[t_index]
+        self.t_line.set_data([t_x, t_x],
+                             [0, max(h1_pdf.max(), h0_pdf.max())])
+
+        # rejected region under H1, from the threshold to the end of the plot
+        verts = np.empty((self.xlen - t_index + 2, 2))
+        verts[0] = t_x, 0
+        verts[1:-1, 0] = x[t_index:]
+        verts[1:-1, 1] = h1_pdf[t_index:]
+        verts[-1] = x[-1], 0
+        self.shade.set_xy(verts)
+
+        self.info.set_text(r'$\beta$' + '= %3.2f' % spow + ' n = %d' % n
+                           + '\n' + r"$\theta $" + " = %4.2f;  " % theta
+                           + r"$\mu$" + " = %4.2f" % mu)
+        return float(spow)
+
+    def _frame_limits(self, frames):
+        """ fix the t range to the one of all the frames (for blitting) """
+        if self.xlim is None:
+            n, mu, sigma = np.array([frame[:3] for frame in frames],
+                                    dtype=float).T
+            low, high = _x_bounds(n, mu, sigma)
+            self.xlim = low.min(), high.max()
+            self.ax.set_xlim(*self.xlim)
+
+    def animate(self, frames, interval=50, blit=True, **kwargs):
+        """
+        Animation of a sequence of frames
+
+        Parameters:
+        -----------
+        frames: list of tuples
+            (n, mu, sigma) or (n, mu, sigma, alpha) for each frame
+        interval: int
+            Delay between frames, in ms
+        blit: bool
+            Only redraw the artists that change. The t range is then fixed
+            to the range of all the frames
+        kwargs:
+            Passed to matplotlib.animation.FuncAnimation
+
+        Returns:
+        --------
+        matplotlib.animation.FuncAnimation
+        """
+        frames = list(frames)
+        if blit:
+            self._frame_limits(frames)
+
+        def draw(frame):
+            self.update(*frame)
+            return self.artists
+
+        return FuncAnimation(self.ax.figure, draw, frames=frames,
+                             init_func=lambda: self.artists,
+                             interval=interval, blit=blit, **kwargs)
+
+    def save_frames(self, frames, pattern='power_{:04d}.png', fixed=True,
+                    **kwargs):
+        """
+        Render each frame to an image file, reusing the same figure
+
+        Parameters:
+        -----------
+        frames: list of tuples
+            (n, mu, sigma) or (n, mu, sigma, alpha) for each frame
+        pattern: str
+            File name of the frames, formatted with the frame number
+        fixed: bool
+            Use the same t range for all the frames
+        kwargs:
+            Passed to savefig, eg dpi
+
+        Returns:
+        --------
+        list of str
+            The file names
+        """
+        frames = list(frames)
+        if fixed:
+            self._frame_limits(frames)
+        fig = self.ax.figure
+        filenames = []
+        for i, frame in enumerate(frames):
+            self.update(*frame)
+            filename = pattern.format(i)
+            fig.savefig(filename, **kwargs)
+            filenames.append(filename)
+        return filenames
+
+
+def plot_power(n=16, mu=1., sigma=1., alpha=0.05, xlen=500):
+    """
+    Plot the H0 and H1 sampling densities, with the power shaded
+
+    Returns:
+    --------
+    PowerPlot
+        Call its update method to redraw for other parameters
+    """
+    power_plot = PowerPlot(alpha=alpha, xlen=xlen)
+    power_plot.update(n, mu, sigma)
+    return power_plot
+
+
+def plot_power_curves(muse, nses, sigma=1., alpha=0.05, ax=None,
+                      cmap='viridis', max_legend=10, tol=1e-4):
+    """
+    Plot power as a function of the number of subjects, one curve per effect
+    size, as a single LineCollection
+
+    Parameters:
+    -----------
+    muse: array of float
+        The effect sizes (means of the alternative)
+    nses: array of int
+        The numbers of subjects
+    sigma, alpha: float
+        See power_analysis.power_curves
+    ax: None or matplotlib Axes
+        Where to draw, the current axes if None
+    cmap: str
+        Colormap of the curves, from the smallest to the largest effect
+    max_legend: int
+        With up to max_legend effects, a legend gives d = mu/sigma for each
+        curve, otherwise a colorbar
+    tol: None or float
+        The maximum error on the power, see power_analysis.power_curves
+
+    Returns:
+    --------
+    matplotlib.collections.LineCollection
+    """
+    ax = plt.gca() if ax is None else ax
+    muse = np.asarray(muse, dtype=float)
+    nses = np.asarray(nses)
+    pws = power_curves(muse, nses, sigma, alpha, tol=tol)
+    segments = np.stack(np.broadcast_arrays(nses[np.newaxis, :], pws),
+                        axis=-1)
+    lines = LineCollection(segments, cmap=cmap)
+    lines.set_array(muse/sigma)
+    ax.add_collection(lines)
+    ax.autoscale_view()
+    ax.set_xlabel(" Number of subjects ")
+    ax.set_ylabel(" Power ")
+
+    if muse.size <= max_legend:
+        colors = lines.to_rgba(muse/sigma)
+        handles = [Line2D([], [], color=color) for color in colors]
+        ax.legend(handles, ['d=' + str(d) for d in muse/sigma],
+                  loc='upper right', shadow=True)
+    else:
+        ax.figure.colorbar(lines, ax=ax, label='d')
+    return lines
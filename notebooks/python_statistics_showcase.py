@@ -186,6 +186,18 @@ n =  len(data) # sample size
 # - `BF10` : Bayes Factor of the alternative hypothesis (Pearson only)
 # - `power` : achieved power of the test (= 1 - type II error)
 
+# +
+# Bootstrapped confidence intervals of the means, correlations and Cohen's d (light vs dark hair)
+# of all the columns at once, on the same resamples
+import bootstrap
+columns = data[['FSIQ', 'VIQ', 'PIQ', 'Weight', 'Height', 'MRI_Count']]
+light = (data['Hair'] == 'light').values
+bootstrap.bootstrap({'mean': bootstrap.means(columns),
+                     'r': bootstrap.correlations(columns),
+                     'd': bootstrap.cohen_d(columns, light)},
+                    n_boot=10000, method='bca', strata=light, random_state=0)
+# -
+
 # ### Pairwise correlations between columns of a dataframe
 
 # +
@@ -325,8 +337,9 @@ sns.set(style='ticks', context='notebook', font_scale=1.2)
 d = 0.5  # Fixed effect size
 n = np.arange(5, 80, 5)  # Incrementing sample size
 
-# Compute the achieved power
-pwr = pg.power_ttest(d=d, n=n, contrast='paired', tail='two-sided')
+# Compute the achieved power (paired_power broadcasts over n, like pg.power_ttest)
+from power_analysis import paired_power
+pwr = paired_power(n, mu=d, sigma=1., two_sided=True)
 
 # Start the plot
 plt.plot(n, pwr, 'ko-.')
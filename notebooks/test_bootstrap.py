@@ -0,0 +1,105 @@
+import unittest
+
+import numpy as np
+import scipy.stats as sst
+
+import bootstrap
+
+
+def loop_statistics(counts, x, y, group):
+    # reference: each resample rebuilt from its counts
+    rows = []
+    for row in counts.astype(int):
+        index = np.repeat(np.arange(x.size), row)
+        xs, ys, gs = x[index], y[index], group[index]
+        a, b = xs[gs], xs[~gs]
+        pooled = np.sqrt(((a.size - 1)*a.var(ddof=1) + (b.size - 1)
+                          * b.var(ddof=1))/(a.size + b.size - 2))
+        rows.append((xs.mean(), np.corrcoef(xs, ys)[0, 1],
+                     (a.mean() - b.mean())/pooled))
+    return np.array(rows)
+
+
+class TestStatistics(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.x = rng.randn(40)
+        self.y = self.x + rng.randn(40)
+        self.group = np.arange(40) < 15
+
+    def test_same_as_loop(self):
+        counts = next(bootstrap.resample_counts(40, 50, random_state=1,
+                                                strata=self.group))
+        self.assertTrue((counts[:, self.group].sum(axis=1) == 15).all())
+        statistics = (bootstrap.means(self.x),
+                      bootstrap.correlations(self.x, self.y),
+                      bootstrap.cohen_d(self.x, self.group))
+        results = np.concatenate([s[0](counts) for s in statistics], axis=1)
+        np.testing.assert_allclose(
+            results, loop_statistics(counts, self.x, self.y, self.group),
+            rtol=1e-10)
+
+    def test_missing_values(self):
+        x = self.x.copy()
+        x[[3, 7]] = np.nan
+        statistic, labels, n = bootstrap.correlations(
+            np.column_stack((x, self.y)))
+        self.assertEqual((labels, n), (['0-1'], 40))
+        valid = ~np.isnan(x)
+        self.assertAlmostEqual(statistic(np.ones((1, 40)))[0, 0],
+                               np.corrcoef(x[valid], self.y[valid])[0, 1])
+
+
+class TestBootstrap(unittest.TestCase):
+    def setUp(self):
+        self.x = np.random.RandomState(0).standard_exponential(30)
+
+    def test_percentile(self):
+        results = bootstrap.bootstrap({'mean': bootstrap.means(self.x)},
+                                      n_boot=2000, method='percentile',
+                                      chunk_size=300, random_state=2)
+        boot = np.concatenate([counts.dot(self.x)/30 for counts in
+                               bootstrap.resample_counts(30, 2000,
+                                                         random_state=2)])
+        np.testing.assert_allclose(results[['low', 'high']].values[0],
+                                   np.percentile(boot, [2.5, 97.5]))
+        self.assertAlmostEqual(results['se'].iloc[0], boot.std(ddof=1))
+
+    @unittest.skipUnless(hasattr(sst, 'bootstrap'), "needs scipy >= 1.7")
+    def test_bca(self):
+        results = bootstrap.bootstrap({'mean': bootstrap.means(self.x)},
+                                      n_boot=20000, random_state=0)
+        expected = sst.bootstrap((self.x,), np.mean, n_resamples=20000,
+                                 method='BCa', random_state=0)
+        np.testing.assert_allclose(results[['low', 'high']].values[0],
+                                   expected.confidence_interval, rtol=.03)
+
+    def test_generator(self):
+        results = [bootstrap.bootstrap({'mean': bootstrap.means(self.x)},
+                                       n_boot=500,
+                                       random_state=np.random.default_rng(3))
+                   for _ in range(2)]
+        np.testing.assert_array_equal(results[0].values, results[1].values)
+        self.assertTrue(results[0]['low'].iloc[0] < self.x.mean()
+                        < results[0]['high'].iloc[0])
+
+    def test_blocks(self):
+        table = np.random.RandomState(1).randn(30, 6)
+        statistics = {'mean': bootstrap.means(table),
+                      'r': bootstrap.correlations(table)}
+        results = [bootstrap.bootstrap(statistics, n_boot=500,
+                                       block_size=block_size, random_state=4)
+                   for block_size in (4, 100)]
+        np.testing.assert_allclose(results[0].values, results[1].values)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            bootstrap.bootstrap({'mean': bootstrap.means(self.x)},
+                                method='normal')
+        with self.assertRaises(ValueError):
+            bootstrap.bootstrap({'a': bootstrap.means(self.x),
+                                 'b': bootstrap.means(self.x[1:])})
+
+
+if __name__ == '__main__':
+    unittest.main()
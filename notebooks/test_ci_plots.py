@@ -0,0 +1,66 @@
+import unittest
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+import ci_plots
+import ttest_sims
+
+
+class TestMinmaxEnvelope(unittest.TestCase):
+    def test_same_as_loop(self):
+        y = np.random.RandomState(0).randn(1003)
+        mask = y > 1.5
+        starts, low, high = ci_plots.minmax_envelope(y, 10)
+        _, mask_low, mask_high = ci_plots.minmax_envelope(y, 10, mask)
+        bins = np.split(np.arange(y.size), starts[1:])
+        self.assertEqual(len(bins), 10)
+        for i, index in enumerate(bins):
+            self.assertEqual((low[i], high[i]), (y[index].min(),
+                                                 y[index].max()))
+            if mask[index].any():
+                self.assertEqual(mask_high[i], y[index][mask[index]].max())
+            else:
+                self.assertTrue(np.isnan(mask_low[i]))
+        with self.assertRaises(ValueError):
+            ci_plots.minmax_envelope(y[:5], 10)
+
+
+class TestPlotDetectedIntervals(unittest.TestCase):
+    def tearDown(self):
+        plt.close('all')
+
+    def plotted_points(self, Nexp, decimate=None):
+        results = ttest_sims.confidence_intervals(
+            Nexp, n=30, mu=.3, random_state=0, sampler='sufficient')
+        fig, ax = plt.subplots(figsize=(4, 2), dpi=50)
+        handles = ci_plots.plot_detected_intervals(*results, mu=.3, ax=ax,
+                                                   decimate=decimate)
+        self.assertEqual(len(handles), 5)
+        return sum(len(line.get_xdata()) for line in ax.lines) + sum(
+            len(path.vertices) for collection in ax.collections
+            for path in collection.get_paths())
+
+    def test_size_depends_on_width(self):
+        # the axes are ~155 pixels wide
+        small, large = self.plotted_points(10**4), self.plotted_points(10**5)
+        self.assertLess(large, 5000)
+        self.assertLess(abs(large - small), 500)
+        self.assertGreater(self.plotted_points(10**4, decimate=False),
+                           3*3000)
+
+    def test_misses_are_marked(self):
+        effect, detect, lCI, uCI = ttest_sims.confidence_intervals(
+            500, n=30, mu=.3, random_state=1, sampler='sufficient')
+        ci_plots.plot_detected_intervals(effect, detect, lCI, uCI, .3,
+                                         decimate=False)
+        marked = sum(len(line.get_xdata()) for line in plt.gca().lines
+                     if line.get_marker() == '.')
+        self.assertEqual(marked, ((lCI[detect] > .3)
+                                  | (uCI[detect] < .3)).sum())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import scipy.stats as sst
+
+import effect_sizes
+
+
+class TestLogSpace(unittest.TestCase):
+    def test_parse_pvalues(self):
+        log_p = effect_sizes.log_pvalues(['0.05', '6.6311e-10', '3E-400'])
+        np.testing.assert_allclose(log_p, [np.log(.05), np.log(6.6311e-10),
+                                           np.log(3) - 400*np.log(10)])
+        np.testing.assert_allclose(effect_sizes.log_pvalues([.05, 1e-300]),
+                                   np.log([.05, 1e-300]))
+
+    def test_norm_isf(self):
+        p = np.array([.3, 1e-10, 1e-250])
+        np.testing.assert_allclose(effect_sizes.norm_isf_log(np.log(p)),
+                                   sst.norm.isf(p))
+        log_p = np.array([-700., -1000., -10**5])
+        np.testing.assert_allclose(
+            sst.norm.logsf(effect_sizes.norm_isf_log(log_p)), log_p)
+
+    def test_t_isf(self):
+        p = np.array([.3, 1e-5, 1e-12, 1e-200])
+        np.testing.assert_allclose(effect_sizes.t_isf_log(np.log(p), 30),
+                                   sst.t.isf(p, 30))
+        # for df=1 (Cauchy) the tail is 1 / (pi t)
+        t = effect_sizes.t_isf_log(-600., 1)
+        self.assertAlmostEqual(np.log(t), 600 - np.log(np.pi))
+        # large df: first order expansion around the normal deviate
+        z = effect_sizes.norm_isf_log(-1000.)
+        self.assertAlmostEqual(effect_sizes.t_isf_log(-1000., 10**6),
+                               z + (z**3 + z)/(4*10**6), places=4)
+
+
+class TestBackCalculate(unittest.TestCase):
+    def test_apoe_example(self):
+        # as in Power-basics
+        results = effect_sizes.back_calculate(['6.6311e-10'], [733], 'z',
+                                              sides=1)
+        z = sst.norm(0, 1.).isf(6.6311e-10)
+        self.assertAlmostEqual(results['z'][0], z)
+        self.assertAlmostEqual(results['d'][0], z/np.sqrt(733))
+
+    def test_t_tests(self):
+        results = effect_sizes.back_calculate(
+            [.02, .02, .04], [20, 40, 20], ['one-sample', 'two-sample', 'z'],
+            sides=[2, 2, 1], effects=[.5])
+        np.testing.assert_allclose(results['statistic'],
+                                   [sst.t.isf(.01, 19), sst.t.isf(.01, 38),
+                                    sst.norm.isf(.04)])
+        np.testing.assert_allclose(results['d'][:2],
+                                   [sst.t.isf(.01, 19)/np.sqrt(20),
+                                    sst.t.isf(.01, 38)*2/np.sqrt(40)])
+        self.assertTrue((np.diff(results['power_0.5']) != 0).all())
+        with self.assertRaises(ValueError):
+            effect_sizes.back_calculate([.01], [10], 'anova')
+
+    def test_broadcasting(self):
+        results = effect_sizes.back_calculate(['0.01', '0.02'], 30,
+                                              test='one-sample')
+        np.testing.assert_allclose(results['statistic'],
+                                   sst.t.isf([.005, .01], 29))
+        self.assertEqual(results['power_0.5'][0], results['power_0.5'][1])
+        results = effect_sizes.back_calculate(.01, [30, 40], 'two-sample')
+        np.testing.assert_allclose(results['statistic'],
+                                   sst.t.isf(.005, [28, 38]))
+        self.assertEqual(len(effect_sizes.back_calculate(.01, 30, 'paired')),
+                         1)
+
+    def test_csv_in_chunks(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            input_file = os.path.join(tmpdir, 'results.csv')
+            output_file = os.path.join(tmpdir, 'effect_sizes.csv')
+            with open(input_file, 'w') as f:
+                f.write('p,n,test,sides\n')
+                for i in range(25):
+                    f.write('{}e-{},{},{},{}\n'.format(
+                        i % 9 + 1, 20*i + 1, 10 + i,
+                        effect_sizes.TESTS[i % 4], 1 + i % 2))
+            n_rows = effect_sizes.back_calculate_csv(input_file, output_file,
+                                                     chunksize=7)
+            self.assertEqual(n_rows, 25)
+            import pandas as pd
+            output = pd.read_csv(output_file)
+            data = pd.read_csv(input_file, dtype={'p': str})
+            expected = effect_sizes.back_calculate(
+                data['p'].to_numpy(dtype=str), data['n'], data['test'],
+                data['sides'])
+            self.assertEqual(len(output), 25)
+            np.testing.assert_allclose(output[expected.columns], expected,
+                                       rtol=1e-12)
+            self.assertTrue(np.isfinite(output['d']).all())
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+
+import multiple_testing
+
+
+def reference_rejections(pvalues, alpha, method):
+    # the textbook procedures, on all the p-values
+    m = pvalues.size
+    sorted_p = np.sort(pvalues)
+    if method == 'bonferroni':
+        return (pvalues <= alpha/m).sum()
+    if method == 'holm':
+        for i, p in enumerate(sorted_p):
+            if p > alpha/(m - i):
+                return i
+        return m
+    k = [i + 1 for i, p in enumerate(sorted_p) if p <= alpha*(i + 1)/m]
+    return max(k) if k else 0
+
+
+class TestNRejected(unittest.TestCase):
+    def test_same_as_full_procedures(self):
+        rng = np.random.RandomState(0)
+        for trial in range(50):
+            pvalues = np.concatenate((rng.uniform(size=200),
+                                      rng.uniform(0, 1e-3, size=trial)))
+            small = np.sort(pvalues[pvalues <= 0.05])
+            for method in multiple_testing.METHODS:
+                self.assertEqual(
+                    multiple_testing.n_rejected(small, pvalues.size, 0.05,
+                                                method),
+                    reference_rejections(pvalues, 0.05, method))
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            multiple_testing.n_rejected(np.zeros(3), 10, method='sidak')
+
+
+class TestMassUnivariatePower(unittest.TestCase):
+    def test_error_rates_and_power(self):
+        results = multiple_testing.mass_univariate_power(
+            m=20000, fraction=.2, n=20, mu=.8, n_reps=200, random_state=0)
+        power, any_power = multiple_testing.bonferroni_power(
+            m=20000, fraction=.2, n=20, mu=.8)
+        bonferroni = results.loc['bonferroni']
+        self.assertAlmostEqual(bonferroni['power'], power,
+                               delta=4*bonferroni['mc_error'])
+        self.assertLessEqual(bonferroni['fwer'], 0.1)
+        self.assertGreaterEqual(results.loc['holm', 'power'],
+                                bonferroni['power'])
+        # BH controls the FDR at alpha m0 / m
+        self.assertAlmostEqual(results.loc['bh', 'fdr'], 0.05*.8, delta=0.005)
+        self.assertGreater(results.loc['bh', 'power'],
+                           results.loc['holm', 'power'])
+
+    def test_no_effect(self):
+        results = multiple_testing.mass_univariate_power(
+            m=10000, fraction=0., n_reps=300, random_state=1)
+        self.assertTrue((results['power'] == 0).all())
+        for method in multiple_testing.METHODS:
+            self.assertLessEqual(results.loc[method, 'fwer'], 0.05 + 0.04)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+
+import numpy as np
+
+import overfitting
+
+
+class TestPolynomialDegreeSweep(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.X = np.sort(rng.rand(40))
+        self.y = np.cos(1.5 * np.pi * self.X) + rng.randn(40) * 0.1
+        self.degrees = [1, 3, 6]
+
+    def test_same_errors_as_separate_fits(self):
+        x_eval = np.linspace(0, 1, 11)
+        train_mse, cv_mse, y_eval = overfitting.polynomial_degree_sweep(
+            self.X, self.y, self.degrees, cv=5, X_eval=x_eval)
+        self.assertEqual(cv_mse.shape, (5, 3))
+        for i, degree in enumerate(self.degrees):
+            fit = np.polynomial.Polynomial.fit(self.X, self.y, degree)
+            self.assertAlmostEqual(train_mse[i],
+                                   ((fit(self.X) - self.y)**2).mean())
+            np.testing.assert_allclose(y_eval[i], fit(x_eval))
+            for k, test in enumerate(overfitting.cv_folds(40, 5)):
+                train = np.setdiff1d(np.arange(40), test)
+                fit = np.polynomial.Polynomial.fit(self.X[train],
+                                                   self.y[train], degree)
+                self.assertAlmostEqual(
+                    cv_mse[k, i], ((fit(self.X[test]) - self.y[test])**2).mean())
+
+    def test_more_coefficients_than_data(self):
+        train_mse, cv_mse, _ = overfitting.polynomial_degree_sweep(
+            self.X[:10], self.y[:10], [2, 12], cv=2)
+        self.assertAlmostEqual(train_mse[1], 0.)
+        self.assertTrue(np.isfinite(cv_mse).all())
+
+    def test_tied_inputs(self):
+        # 5 distinct values: degrees from 4 on interpolate their means
+        x = np.repeat(np.arange(5.), 4)
+        y = np.random.RandomState(2).randn(20) + x
+        degrees = [1, 3, 4, 6, 10]
+        train_mse, _, _ = overfitting.polynomial_degree_sweep(x, y, degrees,
+                                                              cv=4)
+        group_means = y.reshape(5, 4).mean(axis=1)
+        floor = ((y - np.repeat(group_means, 4))**2).mean()
+        self.assertTrue((np.diff(train_mse) <= 1e-10).all())
+        np.testing.assert_allclose(train_mse[2:], floor)
+        fit = np.polynomial.Polynomial.fit(x, y, 3)
+        self.assertAlmostEqual(train_mse[1], ((fit(x) - y)**2).mean())
+
+
+class TestCrossValidatePairs(unittest.TestCase):
+    def test_all_pairs(self):
+        import pandas as pd
+        rng = np.random.RandomState(1)
+        data = pd.DataFrame({'a': rng.rand(30), 'b': rng.rand(30),
+                             'c': rng.rand(30), 'name': ['x']*30})
+        data.loc[3, 'b'] = np.nan
+        results = overfitting.cross_validate_pairs(data, [1, 3], cv=5,
+                                                   n_workers=1)
+        self.assertEqual(len(results), 3*2*2)
+        self.assertEqual(list(results.columns),
+                         ['train_mse', 'cv_mse', 'cv_std'])
+
+        table = data[['a', 'b', 'c']].dropna()
+        train_mse, cv_mse, _ = overfitting.polynomial_degree_sweep(
+            table['c'], table['a'], [1, 3], cv=5)
+        np.testing.assert_allclose(results.loc[('c', 'a'), 'train_mse'],
+                                   train_mse)
+        np.testing.assert_allclose(results.loc[('c', 'a'), 'cv_mse'],
+                                   cv_mse.mean(axis=0))
+
+        in_pool = overfitting.cross_validate_pairs(data, [1, 3], cv=5,
+                                                   n_workers=2)
+        np.testing.assert_allclose(in_pool.to_numpy(), results.to_numpy())
+
+
+if __name__ == "__main__":
+    unittest.main()
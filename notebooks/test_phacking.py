@@ -0,0 +1,34 @@
+import unittest
+
+import numpy as np
+
+import phacking
+
+
+class TestStrategies(unittest.TestCase):
+    def test_single_peek_is_honest(self):
+        honest = phacking.honest(2000, n=20, random_state=0)
+        stopping = phacking.optional_stopping(2000, n_min=20, n_max=20,
+                                              random_state=0)
+        np.testing.assert_array_equal(honest, stopping)
+
+    def test_rates_are_inflated(self):
+        honest, err = phacking.phacking_rate('honest', 40000, random_state=1)
+        self.assertAlmostEqual(honest, 0.05, delta=4*err)
+        for name in ('optional_stopping', 'outlier_trimming',
+                     'multiple_outcomes', 'switch_sidedness'):
+            rate, err = phacking.phacking_rate(name, 40000, random_state=2)
+            self.assertGreater(rate, honest + 4*err)
+
+    def test_switch_sidedness_doubles_alpha(self):
+        rate, err = phacking.phacking_rate('switch_sidedness', 40000,
+                                           alpha=0.05, random_state=3)
+        self.assertAlmostEqual(rate, 0.1, delta=4*err)
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            phacking.phacking_rate('fishing', 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,207 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import scipy.stats as sst
+
+import power_analysis
+
+
+def scalar_power(n, mu, sigma, alpha):
+    # the original, one point at a time, computation of the notebooks
+    df = n-1
+    theta = np.sqrt(n)*mu/sigma
+    t_alph_null = sst.t.isf(alpha, df)
+    return 1 - sst.nct(df, theta).cdf(t_alph_null)
+
+
+class TestStatPower(unittest.TestCase):
+    def test_scalar(self):
+        pw = power_analysis.stat_power(16, .5, 1., 0.05)
+        self.assertIsInstance(pw, float)
+        self.assertAlmostEqual(pw, scalar_power(16, .5, 1., 0.05))
+
+    def test_broadcasts_over_the_grid(self):
+        nses = np.arange(7, 77, 10)
+        muse = np.array([.05, .2, .6])
+        pws = power_analysis.stat_power(nses[np.newaxis, :],
+                                        muse[:, np.newaxis], 2., 0.001)
+        self.assertEqual(pws.shape, (3, 7))
+        for i, mu in enumerate(muse):
+            for j, n in enumerate(nses):
+                self.assertAlmostEqual(pws[i, j],
+                                       scalar_power(n, mu, 2., 0.001))
+
+
+class TestPowerCurves(unittest.TestCase):
+    def test_same_as_stat_power(self):
+        muse, nses = (.05, .1, .2, .3), range(7, 77, 2)
+        expected = power_analysis.stat_power(
+            np.asarray(nses)[np.newaxis, :], np.asarray(muse)[:, np.newaxis],
+            2., 0.001)
+        np.testing.assert_allclose(
+            power_analysis.power_curves(muse, nses, 2., 0.001), expected)
+        approx = power_analysis.power_curves(muse, nses, 2., 0.001, tol=1e-4)
+        self.assertEqual(approx.shape, (4, 35))
+        self.assertLessEqual(np.abs(approx - expected).max(), 1e-4)
+
+
+class TestSampleSize(unittest.TestCase):
+    def test_smallest_n_with_enough_power(self):
+        pw = np.array([.5, .8, .95])[:, np.newaxis]
+        mu = np.array([.1, .4, 1., 2.5])
+        for alpha in (0.05, 1e-4):
+            n = power_analysis.sample_size(pw, mu, 1., alpha)
+            self.assertEqual(n.shape, (3, 4))
+            self.assertTrue((power_analysis.stat_power(n, mu, 1., alpha)
+                             >= pw).all())
+            before = power_analysis.stat_power(np.maximum(n - 1, 2), mu, 1.,
+                                               alpha)
+            self.assertTrue(((n == 2) | (before < pw)).all())
+
+    def test_more_than_normal_approximation(self):
+        n = power_analysis.sample_size(.8, .4, 1., 0.05)
+        self.assertEqual(n, 41)
+        self.assertGreater(n, power_analysis.n_power(.8, .4, 1., 0.05))
+
+    def test_impossible(self):
+        with self.assertRaises(ValueError):
+            power_analysis.sample_size(.8, 0., 1., 0.05)
+
+
+class TestTieredPower(unittest.TestCase):
+    def test_error_within_tolerance(self):
+        nses = np.arange(5, 3000, 7)[np.newaxis, :]
+        muse = np.linspace(0, .5, 30)[:, np.newaxis]
+        for alpha in (0.05, 1e-4):
+            exact = power_analysis.stat_power(nses, muse, 1., alpha)
+            for tol in (1e-3, 1e-6):
+                pws, tiers = power_analysis.tiered_power(nses, muse, 1.,
+                                                         alpha, tol=tol)
+                self.assertEqual(pws.shape, exact.shape)
+                self.assertLessEqual(np.abs(pws - exact).max(), tol)
+                self.assertEqual(tiers['normal'] + tiers['exact'],
+                                 exact.size)
+                self.assertGreater(tiers['normal'], 0)
+
+    def test_small_n_is_exact(self):
+        pw, tiers = power_analysis.tiered_power(10, .5, 1., tol=1.)
+        self.assertEqual(tiers, {'normal': 0, 'exact': 1})
+        self.assertEqual(pw, power_analysis.stat_power(10, .5, 1.))
+
+
+class TestDesigns(unittest.TestCase):
+    def rejection_rate(self, pvalues, alpha=0.05):
+        rate = (pvalues <= alpha).mean()
+        return rate, 4*np.sqrt(rate*(1 - rate)/pvalues.size)
+
+    def test_paired_is_one_sample_on_differences(self):
+        self.assertAlmostEqual(power_analysis.paired_power(20, .3, 1.),
+                               power_analysis.stat_power(20, .3, 1.))
+        self.assertAlmostEqual(
+            power_analysis.paired_power(20, .3, 1., rho=.5),
+            power_analysis.stat_power(20, .3, 1.))
+        two_sided = power_analysis.paired_power(20, .3, 1., two_sided=True)
+        self.assertLess(two_sided, power_analysis.stat_power(20, .3, 1.))
+        self.assertGreater(two_sided, power_analysis.stat_power(20, .3, 1.,
+                                                                0.025))
+
+    def test_two_sample_against_simulation(self):
+        rng = np.random.RandomState(0)
+        for sigma2, equal_var in ((1., True), (3., False)):
+            x = rng.normal(.6, 1., size=(20000, 12))
+            y = rng.normal(0., sigma2, size=(20000, 20))
+            pvalues = sst.ttest_ind(x, y, axis=1, equal_var=equal_var).pvalue
+            rate, error = self.rejection_rate(pvalues)
+            power = power_analysis.two_sample_power(
+                12, 20, .6, 1., sigma2=None if equal_var else sigma2,
+                two_sided=True)
+            self.assertAlmostEqual(rate, power, delta=error)
+
+    def test_anova_against_simulation(self):
+        rng = np.random.RandomState(1)
+        means = np.array([0., .2, .5, .5])
+        data = rng.normal(means[:, None, None], 1., size=(4, 20000, 10))
+        group_means = data.mean(axis=2)
+        between = 10*group_means.var(axis=0)*4/3
+        within = data.var(axis=2, ddof=1).mean(axis=0)
+        pvalues = sst.f.sf(between/within, 3, 36)
+        rate, error = self.rejection_rate(pvalues)
+        power = power_analysis.anova_power(4, 10, means.std())
+        self.assertAlmostEqual(rate, power, delta=error)
+        # with two groups, the F test is the two sided t-test
+        self.assertAlmostEqual(
+            power_analysis.anova_power(2, 15, .25),
+            power_analysis.two_sample_power(15, 15, .5, two_sided=True))
+
+    def test_broadcast(self):
+        nses = np.arange(5, 50)[np.newaxis, :]
+        muse = np.linspace(0, 1, 7)[:, np.newaxis]
+        self.assertEqual(power_analysis.two_sample_power(
+            nses, 2*nses, muse, sigma2=2.).shape, (7, 45))
+        self.assertEqual(power_analysis.anova_power(
+            np.arange(2, 6)[:, None, None], nses, muse).shape, (4, 7, 45))
+
+
+class TestPowerTable(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.table = power_analysis.PowerTable(
+            dfs=np.arange(5, 40), theta_range=(-2., 8., 201),
+            alphas=(0.05, 0.01), cache_dir=self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_error_within_bound(self):
+        n = np.arange(6, 41)[:, np.newaxis]
+        mu = np.linspace(-.5, 1.2, 50)
+        pw, bound = self.table.power(n, mu, 1., 0.01, tol=1.,
+                                     return_bound=True)
+        exact = power_analysis.stat_power(n, mu, 1., 0.01)
+        self.assertTrue((np.abs(pw - exact) <= bound + 1e-12).all())
+        theta = np.sqrt(n)*mu
+        self.assertTrue((bound[(theta >= -2.) & (theta <= 8.)] > 0).all())
+
+    def test_exact_outside_the_grid(self):
+        for args in ((100, .5, 1., 0.05),   # df not in the table
+                     (16, .5, 1., 0.02),    # alpha not in the table
+                     (16, 3., 1., 0.05)):   # theta out of range
+            pw, bound = self.table.power(*args, return_bound=True)
+            self.assertEqual(bound, 0.)
+            self.assertAlmostEqual(pw, power_analysis.stat_power(*args))
+
+    def test_scalar_lookup(self):
+        n = np.arange(6, 41)[:, np.newaxis]
+        mu = np.linspace(-.5, 1.2, 50)
+        for alpha in (0.05, 0.02):
+            pw, bound = self.table.power(n, mu, 1., alpha, return_bound=True)
+            for i, j in [(0, 0), (3, 20), (20, 25), (34, 49), (10, 40)]:
+                scalar = self.table.power(int(n[i, 0]), float(mu[j]), 1.,
+                                          alpha, return_bound=True)
+                self.assertAlmostEqual(scalar[0], pw[i, j], places=12)
+                self.assertEqual(scalar[1], bound[i, j])
+
+    def test_built_on_first_use(self):
+        self.assertFalse(os.path.exists(self.table.path))
+        self.table.power(100, .5)   # df not in the table: exact
+        self.assertFalse(os.path.exists(self.table.path))
+        self.table.power(16, .5)
+        self.assertTrue(os.path.exists(self.table.path))
+
+    def test_table_is_reused(self):
+        self.table.power(16, .5)
+        mtime = os.path.getmtime(self.table.path)
+        table = power_analysis.PowerTable(
+            dfs=np.arange(5, 40), theta_range=(-2., 8., 201),
+            alphas=(0.05, 0.01), cache_dir=self.cache_dir)
+        table.power(16, .5)
+        self.assertEqual(table.path, self.table.path)
+        self.assertEqual(os.path.getmtime(table.path), mtime)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
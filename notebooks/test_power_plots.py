@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+import power_analysis
+import power_plots
+
+
+class TestPowerPlot(unittest.TestCase):
+    def tearDown(self):
+        plt.close('all')
+
+    def test_shaded_area_is_the_power(self):
+        power_plot = power_plots.PowerPlot(xlen=2000)
+        for n, mu in ((17, .5), (50, .25)):
+            pw = power_plot.update(n, mu, 2.)
+            self.assertAlmostEqual(pw, power_analysis.stat_power(n, mu, 2.))
+            x, y = power_plot.shade.get_xy()[:-1].T
+            # the plot stops at the 99.9% quantile of H1
+            area = ((y[1:] + y[:-1])/2*np.diff(x)).sum()
+            self.assertAlmostEqual(area, pw - 0.001, delta=2e-3)
+
+    def test_artists_are_reused(self):
+        power_plot = power_plots.PowerPlot()
+        artists = power_plot.artists
+        xlabel = power_plot.ax.get_xlabel()
+        for n in (10, 20, 40):
+            power_plot.update(n, .5, 1.)
+        self.assertEqual(power_plot.artists, artists)
+        # what changes from frame to frame is in the blitted artists
+        self.assertEqual(power_plot.ax.get_xlabel(), xlabel)
+        self.assertIn('= 3.16', power_plot.info.get_text())
+        self.assertEqual(len(power_plot.ax.lines), 3)
+        self.assertEqual(len(power_plot.ax.patches), 1)
+        self.assertEqual(len(plt.get_fignums()), 1)
+
+    def test_animation_has_fixed_range(self):
+        power_plot = power_plots.PowerPlot()
+        frames = [(n, .5, 1.) for n in range(5, 50, 5)]
+        power_plot.animate(frames)
+        low, high = power_plot.ax.get_xlim()
+        for n, mu, sigma in frames:
+            frame_low, frame_high = power_plots._x_bounds(n, mu, sigma)
+            self.assertTrue(low <= frame_low and frame_high <= high)
+        power_plot.update(*frames[-1])
+        self.assertEqual(power_plot.ax.get_xlim(), (low, high))
+
+    def test_save_frames(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            power_plot = power_plots.PowerPlot()
+            filenames = power_plot.save_frames(
+                [(n, .5, 1., .01) for n in (5, 10, 20)],
+                os.path.join(tmpdir, 'frame_{:02d}.png'), dpi=20)
+            self.assertEqual([os.path.basename(f) for f in filenames],
+                             ['frame_00.png', 'frame_01.png', 'frame_02.png'])
+            self.assertTrue(all(os.path.getsize(f) > 0 for f in filenames))
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestPowerCurves(unittest.TestCase):
+    def tearDown(self):
+        plt.close('all')
+
+    def test_one_collection(self):
+        fig, ax = plt.subplots()
+        lines = power_plots.plot_power_curves(np.linspace(.05, 1, 200),
+                                              np.arange(5, 1005), ax=ax)
+        self.assertEqual(len(ax.collections), 1)
+        self.assertEqual(len(lines.get_segments()), 200)
+        self.assertEqual(lines.get_segments()[0].shape, (1000, 2))
+        self.assertIsNone(ax.get_legend())
+
+    def test_legend_for_a_few_effects(self):
+        fig, ax = plt.subplots()
+        power_plots.plot_power_curves((.1, .2, .5), range(7, 77, 2), ax=ax)
+        self.assertEqual([text.get_text() for text in
+                          ax.get_legend().get_texts()],
+                         ['d=0.1', 'd=0.2', 'd=0.5'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,247 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import scipy.stats as sst
+
+import ttest_sims
+
+
+def yield_a_pvalue(distrib, N=30):
+    # reference implementation, as in P-value-exercise
+    sample = distrib.rvs(size=(N,))
+    sample_mean = sample.mean()
+    std_corrected = np.sqrt(np.var(sample, ddof=1))
+    t_value = sample_mean / (std_corrected/np.sqrt(N))
+    return sst.t.sf(t_value, df=N-1)
+
+
+class TestBatchPvalues(unittest.TestCase):
+    def test_same_pvalues_as_loop(self):
+        distrib = sst.norm(.1, 1)
+        np.random.seed(42)
+        expected = np.asarray([yield_a_pvalue(distrib, 20) for i in range(500)])
+        np.random.seed(42)
+        pvalues = ttest_sims.batch_pvalues(distrib, 500, 20, batch_size=128)
+        np.testing.assert_array_equal(pvalues, expected)
+
+
+class TestBatchSignificant(unittest.TestCase):
+    def test_same_as_thresholding_pvalues(self):
+        distrib = sst.norm(.2, 1)
+        pvalues = ttest_sims.batch_pvalues(distrib, 5000, 15, random_state=3)
+        significant = ttest_sims.batch_significant(distrib, 5000, 15, 0.05,
+                                                   random_state=3)
+        np.testing.assert_array_equal(significant, pvalues <= 0.05)
+
+    def test_critical_t(self):
+        self.assertAlmostEqual(sst.t.sf(ttest_sims.critical_t(29, 0.01), 29),
+                               0.01)
+
+
+class TestSufficientSampler(unittest.TestCase):
+    def test_equivalent_to_raw_samples(self):
+        # same distribution of effect, standard error and t for both samplers
+        prmtrs = dict(n=12, mu=.3, sigma=2.)
+        raw = ttest_sims.sample_experiments(20000, random_state=0, **prmtrs)
+        suff = ttest_sims.sample_experiments(20000, random_state=1,
+                                             sampler='sufficient', **prmtrs)
+        for x_raw, x_suff in zip(raw + (raw[0]/raw[1],),
+                                 suff + (suff[0]/suff[1],)):
+            self.assertGreater(sst.ks_2samp(x_raw, x_suff).pvalue, 0.01)
+
+    def test_null_pvalues_are_uniform(self):
+        pvalues = ttest_sims.batch_pvalues(sst.norm(0, 3), 20000, N=1000,
+                                           random_state=2,
+                                           sampler='sufficient')
+        self.assertGreater(sst.kstest(pvalues, 'uniform').pvalue, 0.01)
+
+    def test_needs_a_normal(self):
+        with self.assertRaises(ValueError):
+            ttest_sims.batch_pvalues(sst.uniform(0, 1), 10,
+                                     sampler='sufficient')
+
+
+def loop_confidence_intervals(Nexp, CI=.95, **prmtrs):
+    # reference implementation, as in evil-p
+    n, mu, sigma = prmtrs['n'], prmtrs['mu'], prmtrs['sigma']
+    norv = sst.norm(0., sigma)
+    t_ci = sst.t(n-1).isf((1-CI)/2)
+    effect, lCI, uCI, t = (np.zeros((Nexp,)) for i in range(4))
+    for experim in range(Nexp):
+        sample = norv.rvs(size=(n,)) + mu
+        effect[experim] = sample.mean()
+        std_error_mean = np.std(sample, ddof=1)/np.sqrt(n)
+        t[experim] = effect[experim]/std_error_mean
+        lCI[experim] = effect[experim] - t_ci*std_error_mean
+        uCI[experim] = effect[experim] + t_ci*std_error_mean
+    detect = t > sst.t(n-1).isf(prmtrs['alpha'])
+    return effect, detect, lCI, uCI, t
+
+
+class TestConfidenceIntervals(unittest.TestCase):
+    def test_same_as_loop(self):
+        prmtrs = {'n': 12, 'mu': .3, 'sigma': 2., 'alpha': 0.05}
+        np.random.seed(3)
+        expected = loop_confidence_intervals(500, CI=.9, **prmtrs)
+        np.random.seed(3)
+        results = ttest_sims.confidence_intervals(500, CI=.9, return_t=True,
+                                                  batch_size=128, **prmtrs)
+        self.assertEqual(len(results), 5)
+        for x, y in zip(results, expected):
+            np.testing.assert_allclose(x, y, rtol=1e-12)
+        self.assertEqual(len(ttest_sims.confidence_intervals(10, **prmtrs)),
+                         4)
+
+    def test_coverage(self):
+        effect, detect, lCI, uCI = ttest_sims.confidence_intervals(
+            100000, CI=.95, n=10, mu=.5, random_state=0, sampler='sufficient')
+        coverage = ((lCI <= .5) & (.5 <= uCI)).mean()
+        self.assertAlmostEqual(coverage, .95, delta=4*np.sqrt(.95*.05/1e5))
+
+
+class TestStreamCoverage(unittest.TestCase):
+    def test_same_counts_as_arrays(self):
+        prmtrs = {'n': 10, 'mu': .3, 'sigma': 1., 'alpha': 0.05}
+        effect, detect, lCI, uCI = ttest_sims.confidence_intervals(
+            5000, CI=.9, batch_size=1000, random_state=2, **prmtrs)
+        accumulator = ttest_sims.stream_coverage(
+            5000, CI=.9, chunk_size=1000, random_state=2, **prmtrs)
+        self.assertEqual(accumulator.counts['all'],
+                         [5000, (lCI > .3).sum(), (uCI < .3).sum()])
+        self.assertEqual(accumulator.counts['detected'],
+                         [detect.sum(), (lCI[detect] > .3).sum(),
+                          (uCI[detect] < .3).sum()])
+        summary = accumulator.summary()
+        self.assertAlmostEqual(summary.loc['all', 'coverage'],
+                               ((lCI <= .3) & (.3 <= uCI)).mean())
+        self.assertTrue(((summary['low'] <= summary['coverage'])
+                         & (summary['coverage'] <= summary['high'])).all())
+
+    def test_conditional_coverage(self):
+        accumulator = ttest_sims.stream_coverage(
+            200000, CI=.95, n=10, mu=.3, chunk_size=50000, random_state=0,
+            sampler='sufficient')
+        coverage, mc_error = accumulator.coverage('all')
+        self.assertAlmostEqual(coverage, .95, delta=4*mc_error)
+        # with low power, the detected experiments overestimate the effect
+        coverage, mc_error = accumulator.coverage('detected')
+        self.assertLess(coverage + 4*mc_error, .95)
+
+    def test_precision(self):
+        accumulator = ttest_sims.stream_coverage(
+            10**7, n=10, mu=.3, chunk_size=10000, precision=.01,
+            random_state=0, sampler='sufficient')
+        self.assertLess(accumulator.counts['all'][0], 10**7)
+        self.assertTrue(np.isnan(ttest_sims.CoverageAccumulator(0.)
+                                 .coverage()[0]))
+
+
+class TestWaitingTimes(unittest.TestCase):
+    def test_simulated_waits_are_geometric(self):
+        for mu in (0., .4):
+            waits = ttest_sims.waiting_times(20000, N=10, mu=mu,
+                                             random_state=0,
+                                             sampler='sufficient')
+            geom = ttest_sims.waiting_time_distribution(N=10, mu=mu)
+            self.assertAlmostEqual(waits.mean(), geom.mean(),
+                                   delta=4*geom.std()/np.sqrt(waits.size))
+
+    def test_null_wait_is_one_over_alpha(self):
+        geom = ttest_sims.waiting_time_distribution(significance_thr=0.05)
+        self.assertAlmostEqual(geom.mean(), 19.)
+
+    def test_long_waits_are_refused(self):
+        # about 1e-7 chance of success per test
+        with self.assertRaises(ValueError):
+            ttest_sims.waiting_times(10, N=30, mu=-.5, random_state=0)
+        waits = ttest_sims.waiting_times(10, N=30, mu=-.5, random_state=0,
+                                         method='geometric')
+        self.assertGreater(waits.mean(), 1e5)
+
+
+class TestRejectionRateSweep(unittest.TestCase):
+    def test_grid_shape_and_common_random_numbers(self):
+        rate, mc_error, coords = ttest_sims.rejection_rate_sweep(
+            [0., .2, 2.], [1., 10.], [10, 20], [.05, .01], n_trials=2000,
+            random_state=0, sampler='sufficient')
+        self.assertEqual(rate.shape, (3, 2, 2, 2))
+        self.assertEqual(list(coords), ['m', 'sigma', 'N', 'alpha'])
+        # same m/sigma and same draws: exactly the same rate
+        np.testing.assert_array_equal(rate[1, 0], rate[2, 1])
+        np.testing.assert_array_equal(rate[0, 0], rate[0, 1])
+        self.assertTrue((rate[..., 1] <= rate[..., 0]).all())
+
+    def test_matches_power(self):
+        rate, mc_error, coords = ttest_sims.rejection_rate_sweep(
+            .5, 1., 16, n_trials=20000, random_state=1)
+        power = ttest_sims.success_probability(16, .5, 1.)
+        self.assertAlmostEqual(rate.item(), power, delta=4*mc_error.item())
+
+    def test_raw_samples_are_batched(self):
+        sizes = []
+        sample_experiments = ttest_sims.sample_experiments
+
+        def recording(size, n, *args, **kwargs):
+            sizes.append(size*n)
+            return sample_experiments(size, n, *args, **kwargs)
+        with mock.patch.object(ttest_sims, 'sample_experiments', recording):
+            rate, _, _ = ttest_sims.rejection_rate_sweep(
+                .3, 1., 1000, n_trials=300, batch_size=20000, random_state=2)
+        self.assertLessEqual(max(sizes), 20000)
+        # the batches do not change the draws
+        np.testing.assert_array_equal(rate, ttest_sims.rejection_rate_sweep(
+            .3, 1., 1000, n_trials=300, random_state=2)[0])
+
+
+class TestStreamRejectionRate(unittest.TestCase):
+    def test_intervals_contain_rate(self):
+        for method in ('wilson', 'clopper-pearson'):
+            low, high = ttest_sims.binomial_interval(50, 1000, method=method)
+            self.assertTrue(low < 0.05 < high)
+        self.assertEqual(ttest_sims.binomial_interval(
+            0, 10, method='clopper-pearson')[0], 0.)
+
+    def test_stops_at_precision(self):
+        kwargs = dict(N=10, max_trials=10**6, chunk_size=10000,
+                      precision=0.005, report_every=None, random_state=0)
+        k, n, (low, high) = ttest_sims.stream_rejection_rate(sst.norm(0, 1),
+                                                             **kwargs)
+        self.assertLess(n, 10**6)
+        self.assertLessEqual((high - low)/2, 0.005)
+        self.assertAlmostEqual(k/n, 0.05, delta=0.015)
+        # reproducible without seeding the global random state
+        self.assertEqual(ttest_sims.stream_rejection_rate(sst.norm(0, 1),
+                                                          **kwargs)[:2],
+                         (k, n))
+
+
+class TestParallelMonteCarlo(unittest.TestCase):
+    def test_same_output_whatever_the_number_of_workers(self):
+        kwargs = dict(n_trials=2500, seed=7, block_size=1000, n=16, mu=.3)
+        effect1, sem1 = ttest_sims.parallel_monte_carlo(
+            ttest_sims.sample_experiments, n_workers=1, **kwargs)
+        effect3, sem3 = ttest_sims.parallel_monte_carlo(
+            ttest_sims.sample_experiments, n_workers=3, **kwargs)
+        self.assertEqual(effect1.shape, (2500,))
+        np.testing.assert_array_equal(effect1, effect3)
+        np.testing.assert_array_equal(sem1, sem3)
+
+    def test_no_trials(self):
+        effect, sem = ttest_sims.parallel_monte_carlo(
+            ttest_sims.sample_experiments, 0, seed=1, n_workers=1)
+        self.assertEqual((effect.shape, sem.shape), ((0,), (0,)))
+        pvalues = ttest_sims.parallel_monte_carlo(
+            ttest_sims.batch_pvalues, 0, n_workers=1, args=(sst.norm(0, 1),))
+        self.assertEqual(pvalues.shape, (0,))
+
+    def test_positional_args(self):
+        pvalues = ttest_sims.parallel_monte_carlo(
+            ttest_sims.batch_pvalues, 300, seed=1, n_workers=1,
+            block_size=100, args=(sst.norm(0, 1),), N=10)
+        self.assertEqual(pvalues.shape, (300,))
+        self.assertTrue(((pvalues >= 0) & (pvalues <= 1)).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
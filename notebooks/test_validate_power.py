@@ -0,0 +1,36 @@
+import unittest
+
+import numpy as np
+
+import power_analysis
+import validate_power
+
+
+class TestValidatePower(unittest.TestCase):
+    def test_stat_power_passes(self):
+        results = validate_power.validate_power(
+            [8, 30], [0., .3], [1., 2.], [.05, .01], tol=0.01, random_state=0)
+        self.assertEqual(len(results), 16)
+        self.assertFalse(results['flagged'].any())
+        # enough trials for the tolerance
+        self.assertTrue((4*results['mc_error'] <= 0.01).all())
+        self.assertIn('0 flagged', validate_power.report(results))
+
+    def test_wrong_power_is_flagged(self):
+        def one_sided_at_double_alpha(n, mu, sigma, alpha):
+            return power_analysis.stat_power(n, mu, sigma, 2*alpha)
+        results = validate_power.validate_power(
+            10, [0., .5], 1., .05, tol=0.01, random_state=1,
+            power_function=one_sided_at_double_alpha)
+        self.assertTrue(results['flagged'].all())
+        self.assertIn('2 flagged', validate_power.report(results))
+
+    def test_trials_for_tolerance(self):
+        self.assertEqual(validate_power.trials_for_tolerance(.5, .01, 2.),
+                         10000)
+        np.testing.assert_array_equal(
+            validate_power.trials_for_tolerance([0., 1.]), [1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+import winners_curse
+
+
+class TestExpectedDetectedEffect(unittest.TestCase):
+    def test_against_simulation(self):
+        for kwargs in ({}, {'two_sided': True}, {'known_sigma': True},
+                       {'alpha': .001}):
+            results = winners_curse.check_inflation(
+                [3, 16], [0., .3], Nexp=200000, random_state=0, **kwargs)
+            self.assertLess(results['z'].abs().max(), 4.5, kwargs)
+
+    def test_vectorized(self):
+        n = np.arange(3, 50)[:, np.newaxis]
+        mu = np.linspace(.1, 1., 10)
+        grid = winners_curse.expected_detected_effect(n, mu)
+        self.assertEqual(grid.shape, (47, 10))
+        self.assertAlmostEqual(grid[5, 3],
+                               winners_curse.expected_detected_effect(8,
+                                                                      mu[3]))
+        # always inflated, less with more subjects or larger effects
+        ratio = winners_curse.inflation(n, mu)
+        self.assertTrue((ratio > 1).all())
+        self.assertTrue((np.diff(ratio, axis=0) < 0).all())
+        self.assertTrue((np.diff(ratio, axis=1) < 0).all())
+
+    def test_limits(self):
+        # large samples: the t-test is the z-test
+        self.assertAlmostEqual(
+            winners_curse.expected_detected_effect(10**5, .005),
+            winners_curse.expected_detected_effect(10**5, .005,
+                                                   known_sigma=True),
+            places=5)
+        # high power: no inflation
+        self.assertAlmostEqual(winners_curse.inflation(100, 1.), 1.)
+        with self.assertRaises(ValueError):
+            winners_curse.expected_detected_effect(2)
+
+
+if __name__ == '__main__':
+    unittest.main()
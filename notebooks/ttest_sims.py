@@ -0,0 +1,772 @@
+"""
+Vectorized simulations of one sample t-tests, used by the notebooks.
+
+The notebooks draw one sample at a time and call `sst.t.sf` once per
+experiment. The functions here do the same computation on a whole block
+of experiments at once, so that the demos can be run with millions of
+trials.
+"""
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import scipy.stats as sst
+
+
+def check_random_state(random_state):
+    """ turn an int seed into a RandomState, so that it is only used once """
+    if isinstance(random_state, (int, np.integer)):
+        return np.random.RandomState(random_state)
+    return random_state
+
+
+def t_values_from_samples(samples):
+    """
+    Compute the one sample t statistic of each row of `samples`
+
+    Parameters:
+    -----------
+    samples: array of shape (Nexp, N)
+        One experiment of N observations per row
+
+    Returns:
+    --------
+    array of shape (Nexp,)
+        The t values (mean / standard error of the mean)
+    """
+    N = samples.shape[-1]
+    sample_mean = samples.mean(axis=-1)
+    std_corrected = np.sqrt(np.var(samples, axis=-1, ddof=1))
+    return sample_mean / (std_corrected/np.sqrt(N))
+
+
+def batch_t_values(distrib, N_pval=1000, N=30, batch_size=100000,
+                   random_state=None, sampler='raw'):
+    """
+    Draw N_pval samples of size N from distrib and return their t values
+
+    Samples are drawn as (batch_size, N) blocks, in the same order as a
+    loop over `distrib.rvs(size=(N,))` would draw them.
+
+    Parameters:
+    -----------
+    distrib: scipy.stats frozen distribution (eg, norm(0,1))
+        The sampling distribution
+    N_pval: int
+        The number of experiments
+    N: int
+        The sample size of each experiment
+    batch_size: int
+        Maximum number of experiments drawn at once, to bound memory
+    random_state: None, int or numpy Generator
+        Passed to distrib.rvs. None uses the global numpy random state
+    sampler: str
+        'raw' draws the N observations of each experiment, 'sufficient'
+        draws only their mean and variance (distrib has to be a normal),
+        see sample_experiments
+
+    Returns:
+    --------
+    array of shape (N_pval,)
+        The t values (testing if the mean is > 0)
+    """
+    random_state = check_random_state(random_state)
+    if sampler == 'sufficient' and distrib.dist.name != 'norm':
+        raise ValueError("the sufficient statistic sampler needs a normal "
+                         "distribution, got {}".format(distrib.dist.name))
+
+    t_values = np.empty((N_pval,))
+    for start in range(0, N_pval, batch_size):
+        stop = min(start + batch_size, N_pval)
+        if sampler == 'sufficient':
+            effect, std_error_mean = sample_experiments(
+                stop - start, N, distrib.mean(), distrib.std(),
+                random_state=random_state, sampler=sampler)
+            t_values[start:stop] = effect / std_error_mean
+        else:
+            samples = distrib.rvs(size=(stop - start, N),
+                                  random_state=random_state)
+            t_values[start:stop] = t_values_from_samples(samples)
+    return t_values
+
+
+def batch_pvalues(distrib, N_pval=1000, N=30, batch_size=100000,
+                  random_state=None, sampler='raw'):
+    """
+    Draw N_pval samples of size N from distrib and return their p-values
+
+    This is the vectorized version of calling `yield_a_pvalue(distrib, N)`
+    N_pval times: samples are drawn as a (N_pval, N) block, in the same
+    order as the loop would draw them, so that with the same random state
+    the p-values are the same. The parameters are those of batch_t_values.
+
+    Returns:
+    --------
+    array of shape (N_pval,)
+        The one sided p-values (testing if the mean is > 0)
+    """
+    t_values = batch_t_values(distrib, N_pval, N, batch_size=batch_size,
+                              random_state=random_state, sampler=sampler)
+    return sst.t.sf(t_values, df=N-1)
+
+
+@lru_cache(maxsize=1024)
+def critical_t(df, alpha):
+    """
+    The t value above which a one sided test is significant at alpha
+
+    `sst.t.sf(t, df) <= alpha` is the same as `t >= critical_t(df, alpha)`.
+    Values are cached, so in a large sweep the inverse survival function
+    is only computed once per (df, alpha).
+    """
+    return float(sst.t.isf(alpha, df))
+
+
+def batch_significant(distrib, N_pval=1000, N=30, significance_thr=0.05,
+                      batch_size=100000, random_state=None, sampler='raw'):
+    """
+    Draw N_pval samples of size N from distrib and tell which are significant
+
+    Gives the same result as `batch_pvalues(...) <= significance_thr`, but
+    compares the t values to the critical t instead of computing a p-value
+    for each experiment. Other parameters are those of batch_t_values.
+
+    Returns:
+    --------
+    boolean array of shape (N_pval,)
+        True where the one sided test is significant at significance_thr
+    """
+    t_values = batch_t_values(distrib, N_pval, N, batch_size=batch_size,
+                              random_state=random_state, sampler=sampler)
+    return t_values >= critical_t(N-1, significance_thr)
+
+
+def sample_experiments(Nexp, n=30, mu=0., sigma=1., random_state=None,
+                       sampler='raw'):
+    """
+    Simulate Nexp experiments of n normal observations N(mu, sigma)
+
+    With sampler='raw', the n observations are drawn in the same order as
+    the notebooks' loops (`sst.norm(0, sigma).rvs(size=(n,)) + mu` for each
+    experiment).
+
+    For normal data the mean and the variance are all a t-test or a
+    confidence interval needs, and their distributions are known: the mean
+    is N(mu, sigma/sqrt(n)), and (n-1)s^2/sigma^2 is a chi-square with n-1
+    degrees of freedom, independent of the mean. With sampler='sufficient',
+    these two are drawn directly, so the cost does not depend on n.
+
+    Parameters:
+    -----------
+    Nexp: int
+        The number of experiments
+    n: int
+        The number of observations per experiment
+    mu, sigma: float
+        Mean and standard deviation of the data
+    random_state: None, int or numpy Generator
+        None uses the global numpy random state
+    sampler: str
+        'raw' or 'sufficient'
+
+    Returns:
+    --------
+    effect: array of shape (Nexp,)
+        The sample means
+    std_error_mean: array of shape (Nexp,)
+        The estimated standard errors of the means (ddof=1)
+    """
+    random_state = check_random_state(random_state)
+    if sampler == 'sufficient':
+        effect = sst.norm(mu, sigma/np.sqrt(n)).rvs(size=(Nexp,),
+                                                    random_state=random_state)
+        chi2 = sst.chi2(n-1).rvs(size=(Nexp,), random_state=random_state)
+        std_error_mean = sigma*np.sqrt(chi2/(n-1))/np.sqrt(n)
+        return effect, std_error_mean
+    elif sampler != 'raw':
+        raise ValueError("sampler has to be 'raw' or 'sufficient', "
+                         "got {}".format(sampler))
+
+    samples = sst.norm(0., sigma).rvs(size=(Nexp, n),
+                                      random_state=random_state) + mu
+    effect = samples.mean(axis=-1)
+    std_error_mean = np.std(samples, axis=-1, ddof=1)/np.sqrt(n)
+    return effect, std_error_mean
+
+
+def confidence_intervals(Nexp, CI=.95, n=16, mu=.3, sigma=1., alpha=0.05,
+                         return_t=False, batch_size=100000, random_state=None,
+                         sampler='raw'):
+    """
+    Simulate Nexp experiments, with the confidence interval of each effect
+    and whether it is detected
+
+    This is the vectorized version of the `confidence_intervals` loops of
+    the Misconceptions-Confidence-Intervals and evil-p notebooks: with
+    sampler='raw' the observations are drawn in the same order, so that
+    with the same random state the results are the same.
+
+    Parameters:
+    -----------
+    Nexp: int
+        The number of experiments
+    CI: float
+        The confidence level of the two sided interval (Misconceptions
+        uses t_05 = t.isf(0.05), that is CI=.90)
+    n, mu, sigma, alpha: int, float
+        As in `prmtrs = {'n':16, 'mu':.3, 'sigma': 1., 'alpha': 0.05}`
+    return_t: bool
+        Also return the t values (evil-p)
+    batch_size: int
+        Maximum number of experiments drawn at once, to bound memory
+    random_state: None, int or numpy Generator
+        None uses the global numpy random state
+    sampler: str
+        'raw' or 'sufficient', see sample_experiments
+
+    Returns:
+    --------
+    effect: array of shape (Nexp,)
+        The estimated effect
+    detect: array of bool
+        True when the effect is detected at alpha
+    lCI, uCI: arrays
+        The lower and upper bounds of the confidence interval
+    t: array
+        Only with return_t=True
+    """
+    random_state = check_random_state(random_state)
+    effect = np.empty((Nexp,))
+    std_error_mean = np.empty((Nexp,))
+    for start in range(0, Nexp, batch_size):
+        stop = min(start + batch_size, Nexp)
+        effect[start:stop], std_error_mean[start:stop] = sample_experiments(
+            stop - start, n, mu, sigma, random_state=random_state,
+            sampler=sampler)
+
+    t = effect / std_error_mean
+    half_width = sst.t.isf((1 - CI)/2, n-1) * std_error_mean
+    lCI = effect - half_width
+    uCI = effect + half_width
+    detect = t > critical_t(n-1, alpha)
+    if return_t:
+        return effect, detect, lCI, uCI, t
+    return effect, detect, lCI, uCI
+
+
+def _simulate_block(job):
+    """ run simulate on one block with its own seed (executed in a worker) """
+    simulate, args, size, seed_seq, kwargs = job
+    return simulate(*(args + (size,)),
+                    random_state=np.random.default_rng(seed_seq), **kwargs)
+
+
+def _concatenate(results):
+    """ concatenate a list of arrays, or of tuples of arrays, block-wise """
+    if isinstance(results[0], tuple):
+        return tuple(np.concatenate(parts) for parts in zip(*results))
+    return np.concatenate(results)
+
+
+def parallel_monte_carlo(simulate, n_trials, seed=None, n_workers=None,
+                         block_size=100000, args=(), **kwargs):
+    """
+    Run simulate for n_trials trials, split across worker processes
+
+    The trials are cut in blocks of block_size. Block i gets the i-th child
+    of `np.random.SeedSequence(seed).spawn`, and the block results are put
+    back in block order: for a given seed, the output is the same whatever
+    the number of workers.
+
+    Parameters:
+    -----------
+    simulate: function
+        Called as `simulate(*args, size, random_state=rng, **kwargs)`, it
+        must return an array (or a tuple of arrays) with size rows. It has
+        to be defined at the top level of a module so that it can be
+        pickled, eg `batch_pvalues` or `sample_experiments`
+    n_trials: int
+        The total number of trials
+    seed: None or int
+        The root seed. None takes fresh entropy from the OS
+    n_workers: int or None
+        The number of processes, defaults to the number of CPUs. With 1,
+        everything runs in the current process
+    block_size: int
+        The number of trials per block
+    args: tuple
+        Positional arguments given to simulate before the number of trials,
+        eg `args=(sst.norm(0, 1),)` for batch_pvalues
+
+    Returns:
+    --------
+    array (or tuple of arrays) with n_trials rows
+    """
+    # with no trials, one empty block gives results of the right type
+    n_blocks = max(-(-n_trials // block_size), 1)
+    children = np.random.SeedSequence(seed).spawn(n_blocks)
+    sizes = [min(block_size, n_trials - i*block_size) for i in range(n_blocks)]
+    jobs = [(simulate, tuple(args), size, child, kwargs)
+            for size, child in zip(sizes, children)]
+
+    if n_workers == 1:
+        results = [_simulate_block(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(_simulate_block, jobs))
+
+    return _concatenate(results)
+
+
+def binomial_interval(k, n, conf=0.95, method='wilson'):
+    """
+    Confidence interval for a proportion, having observed k successes over n
+
+    Parameters:
+    -----------
+    k, n: int
+        The number of successes and of trials
+    conf: float
+        The confidence level of the interval
+    method: str
+        'wilson' (score interval) or 'clopper-pearson' (exact interval)
+
+    Returns:
+    --------
+    (float, float)
+        Lower and upper bounds of the interval
+    """
+    if method == 'wilson':
+        z = sst.norm.isf((1 - conf)/2)
+        center = (k + z**2/2) / (n + z**2)
+        half = z / (n + z**2) * np.sqrt(k*(n - k)/n + z**2/4)
+        return (center - half, center + half)
+    elif method == 'clopper-pearson':
+        a = (1 - conf)/2
+        low = sst.beta.ppf(a, k, n - k + 1) if k > 0 else 0.
+        high = sst.beta.isf(a, k + 1, n - k) if k < n else 1.
+        return (low, high)
+    raise ValueError("method has to be 'wilson' or 'clopper-pearson', "
+                     "got {}".format(method))
+
+
+def _peak_memory_mb():
+    """ peak resident memory of the process in MB, or None if unknown """
+    try:
+        import resource
+    except ImportError:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return maxrss / 2**20 if sys.platform == 'darwin' else maxrss / 2**10
+
+
+def stream_rejection_rate(distrib, N=30, significance_thr=0.05,
+                          max_trials=10**9, chunk_size=100000,
+                          precision=None, conf=0.95, method='wilson',
+                          report_every=10, random_state=None, sampler='raw'):
+    """
+    Estimate the rate of significant tests without keeping the p-values
+
+    Trials are run in chunks of chunk_size, and only the running counts are
+    kept, so the memory used does not depend on max_trials.
+
+    Parameters:
+    -----------
+    distrib: scipy.stats frozen distribution
+        The sampling distribution
+    N: int
+        The sample size of each experiment
+    significance_thr: float
+        A test is significant if its p-value is <= significance_thr
+    max_trials: int
+        The maximum number of experiments to run
+    chunk_size: int
+        The number of experiments drawn at once
+    precision: float or None
+        If given, stop as soon as the half width of the confidence interval
+        of the rate is below precision
+    conf: float
+        The confidence level of the interval
+    method: str
+        'wilson' or 'clopper-pearson', see binomial_interval
+    report_every: int or None
+        Print progress (rate, interval, trials/sec, peak memory) every
+        report_every chunks. None to stay silent
+    random_state: None, int or numpy Generator
+        None uses the global numpy random state
+    sampler: str
+        'raw' or 'sufficient', see sample_experiments
+
+    Returns:
+    --------
+    number_significant: int
+    n_trials: int
+        The number of experiments actually run
+    interval: (float, float)
+        Confidence interval of the rate of significant tests
+    """
+    random_state = check_random_state(random_state)
+    number_significant = 0
+    n_trials = 0
+    n_chunks = 0
+    interval = (0., 1.)
+    start = time.perf_counter()
+    while n_trials < max_trials:
+        size = min(chunk_size, max_trials - n_trials)
+        significant = batch_significant(distrib, size, N, significance_thr,
+                                        batch_size=size,
+                                        random_state=random_state,
+                                        sampler=sampler)
+        number_significant += int(significant.sum())
+        n_trials += size
+        n_chunks += 1
+        interval = binomial_interval(number_significant, n_trials, conf, method)
+        done = (precision is not None
+                and (interval[1] - interval[0])/2 <= precision)
+
+        if report_every and (n_chunks % report_every == 0 or done
+                             or n_trials == max_trials):
+            elapsed = time.perf_counter() - start
+            peak = _peak_memory_mb()
+            print("{} trials, rate {:.5f} [{:.5f}, {:.5f}], {:.3g} trials/sec, "
+                  "peak memory {}".format(
+                      n_trials, number_significant/n_trials, interval[0],
+                      interval[1], n_trials/elapsed,
+                      "unknown" if peak is None else "{:.0f} MB".format(peak)))
+        if done:
+            break
+
+    return number_significant, n_trials, interval
+
+
+class CoverageAccumulator(object):
+    """
+    Running counts of confidence intervals that miss the true effect, over
+    all the experiments and over the detected ones only
+
+    Chunks of experiments (eg from confidence_intervals) are given to
+    update, and only the counts are kept: the memory used does not depend
+    on the number of experiments.
+
+    Parameters:
+    -----------
+    mu: float
+        The true effect
+    """
+    def __init__(self, mu):
+        self.mu = mu
+        # experiments, lower bound > mu, upper bound < mu
+        self.counts = {'all': [0, 0, 0], 'detected': [0, 0, 0]}
+
+    def update(self, effect, detect, lCI, uCI):
+        """ add a chunk of experiments, as returned by confidence_intervals """
+        miss_high = lCI > self.mu
+        miss_low = uCI < self.mu
+        for name, counts in (('all', (detect.size, miss_high.sum(),
+                                      miss_low.sum())),
+                             ('detected', (detect.sum(),
+                                           (miss_high & detect).sum(),
+                                           (miss_low & detect).sum()))):
+            self.counts[name] = [int(total + new) for total, new in
+                                 zip(self.counts[name], counts)]
+
+    def coverage(self, subset='detected'):
+        """
+        Returns:
+        --------
+        coverage: float
+            The proportion of intervals containing mu ('all' or 'detected'
+            experiments). nan if there are none yet
+        mc_error: float
+            Its Monte Carlo standard error
+        """
+        n, high, low = self.counts[subset]
+        if n == 0:
+            return np.nan, np.nan
+        coverage = 1 - (high + low)/n
+        return coverage, float(np.sqrt(coverage*(1 - coverage)/n))
+
+    def summary(self, conf=0.95, method='wilson'):
+        """
+        pandas DataFrame with a row for all experiments and one for the
+        detected ones, and columns 'experiments', 'miss_high' (lower bound
+        above mu), 'miss_low' (upper bound below mu), 'coverage', 'mc_error'
+        and 'low', 'high' (confidence interval of the coverage, see
+        binomial_interval)
+        """
+        import pandas as pd
+
+        rows = []
+        for name in ('all', 'detected'):
+            n, high, low = self.counts[name]
+            coverage, mc_error = self.coverage(name)
+            interval = (binomial_interval(n - high - low, n, conf, method)
+                        if n else (np.nan, np.nan))
+            rows.append((n, high, low, coverage, mc_error) + tuple(interval))
+        return pd.DataFrame(rows, index=['all', 'detected'],
+                            columns=['experiments', 'miss_high', 'miss_low',
+                                     'coverage', 'mc_error', 'low', 'high'])
+
+
+def stream_coverage(Nexp, CI=.95, n=16, mu=.3, sigma=1., alpha=0.05,
+                    chunk_size=100000, precision=None, random_state=None,
+                    sampler='raw'):
+    """
+    Coverage of the confidence intervals, over all the experiments and over
+    the detected ones, simulated chunk by chunk with confidence_intervals
+
+    Parameters:
+    -----------
+    Nexp: int
+        The maximum number of experiments
+    CI, n, mu, sigma, alpha:
+        See confidence_intervals
+    chunk_size: int
+        The number of experiments simulated at once
+    precision: None or float
+        If given, stop as soon as the half width of the 95% (Wilson)
+        confidence interval of the coverage of the detected experiments is
+        below precision
+    random_state: None, int or numpy Generator
+        None uses the global numpy random state
+    sampler: str
+        'raw' or 'sufficient', see sample_experiments
+
+    Returns:
+    --------
+    CoverageAccumulator
+        Call its summary method for the table of counts and coverages
+    """
+    random_state = check_random_state(random_state)
+    accumulator = CoverageAccumulator(mu)
+    for start in range(0, Nexp, chunk_size):
+        size = min(chunk_size, Nexp - start)
+        accumulator.update(*confidence_intervals(
+            size, CI, n, mu, sigma, alpha, batch_size=size,
+            random_state=random_state, sampler=sampler))
+        detected, high, low = accumulator.counts['detected']
+        if precision is not None and detected:
+            # the binomial interval, unlike mc_error, is not 0 when no
+            # interval has missed yet
+            lower, upper = binomial_interval(detected - high - low, detected)
+            if (upper - lower)/2 <= precision:
+                break
+    return accumulator
+
+
+def success_probability(N=30, mu=0., sigma=1., significance_thr=0.05):
+    """
+    Probability that one experiment is significant (one sided t-test)
+
+    This is significance_thr under the null (mu=0), the power otherwise.
+    """
+    df = N-1
+    theta = np.sqrt(N)*mu/sigma
+    return float(sst.nct.sf(critical_t(df, significance_thr), df, theta))
+
+
+def waiting_time_distribution(N=30, mu=0., sigma=1., significance_thr=0.05):
+    """
+    The distribution of the number of non significant tests before the
+    first significant one: a geometric distribution on 0, 1, 2, ...
+
+    Returns:
+    --------
+    scipy.stats frozen distribution
+    """
+    p = success_probability(N, mu, sigma, significance_thr)
+    return sst.geom(p, loc=-1)
+
+
+def waiting_times(n_reps, N=30, mu=0., sigma=1., significance_thr=0.05,
+                  method='simulate', random_state=None, sampler='raw',
+                  max_rounds=10**5):
+    """
+    How many tests are done before getting a significant one, n_reps times
+
+    This is the vectorized version of
+
+        nb_of_test_needed = 0
+        while yield_a_pvalue(sst.norm(mu, sigma), N) > significance_thr:
+            nb_of_test_needed += 1
+
+    With method='simulate', all the replications that are still waiting are
+    tested together at each round, so there are only as many Python
+    iterations as the longest wait. With method='geometric', the waiting
+    times are drawn from their analytic distribution (see
+    waiting_time_distribution), which is much faster.
+
+    Parameters:
+    -----------
+    n_reps: int
+        The number of replications
+    N: int
+        The sample size of each test
+    mu, sigma: float
+        The mean and standard deviation of the normal data
+    significance_thr: float
+        A test is significant if its p-value is <= significance_thr
+    method: str
+        'simulate' or 'geometric'
+    random_state: None, int or numpy Generator
+        None uses the global numpy random state
+    sampler: str
+        'raw' or 'sufficient', see sample_experiments
+    max_rounds: int
+        With method='simulate', the largest number of rounds allowed. A
+        ValueError is raised if the longest wait is expected to be longer
+        (eg for a negative effect, use method='geometric' then)
+
+    Returns:
+    --------
+    int array of shape (n_reps,)
+        The number of non significant tests before the first significant one
+    """
+    random_state = check_random_state(random_state)
+    if method == 'geometric':
+        distrib = waiting_time_distribution(N, mu, sigma, significance_thr)
+        return distrib.rvs(size=(n_reps,), random_state=random_state)
+    elif method != 'simulate':
+        raise ValueError("method has to be 'simulate' or 'geometric', "
+                         "got {}".format(method))
+
+    # the longest of n_reps geometric waits is about log(n_reps) / p
+    p = success_probability(N, mu, sigma, significance_thr)
+    if np.log(n_reps + 1) > p*max_rounds:
+        raise ValueError("the probability of a significant test is {:.3g}, "
+                         "the waits would take more than max_rounds={} "
+                         "rounds: use method='geometric'".format(p,
+                                                                 max_rounds))
+
+    distrib = sst.norm(mu, sigma)
+    waits = np.zeros((n_reps,), dtype=int)
+    waiting = np.arange(n_reps)
+    for _ in range(max_rounds):
+        if not waiting.size:
+            break
+        significant = batch_significant(distrib, waiting.size, N,
+                                        significance_thr,
+                                        random_state=random_state,
+                                        sampler=sampler)
+        waiting = waiting[~significant]
+        waits[waiting] += 1
+    if waiting.size:
+        raise ValueError("{} replications still waiting after max_rounds={} "
+                         "rounds: use method='geometric'".format(waiting.size,
+                                                                 max_rounds))
+    return waits
+
+
+def compare_waiting_times(waits, N=30, mu=0., sigma=1., significance_thr=0.05):
+    """
+    Compare simulated waiting times with the geometric distribution
+
+    Parameters:
+    -----------
+    waits: int array
+        Waiting times, eg from waiting_times
+    N, mu, sigma, significance_thr:
+        The parameters used to simulate them
+
+    Returns:
+    --------
+    k: int array
+        0, 1, ..., max(waits)
+    empirical: array
+        The observed frequency of each k
+    analytic: array
+        The geometric probability of each k
+    """
+    distrib = waiting_time_distribution(N, mu, sigma, significance_thr)
+    k = np.arange(waits.max() + 1)
+    empirical = np.bincount(waits, minlength=k.size) / waits.size
+    analytic = distrib.pmf(k)
+    print("mean wait {:.3f} (geometric: {:.3f}), largest difference in "
+          "probability {:.2e}".format(waits.mean(), distrib.mean(),
+                                      np.abs(empirical - analytic).max()))
+    return k, empirical, analytic
+
+
+def rejection_rate_sweep(m, sigma, N, alpha=0.05, n_trials=10000,
+                         batch_size=100000, random_state=None, sampler='raw'):
+    """
+    Rate of significant one sided t-tests over a grid of (m, sigma, N, alpha)
+
+    Data are N(m, sigma). Common random numbers are used: for each N, the
+    same standardized samples z are shared by all the (m, sigma, alpha) of
+    the grid (data = m + sigma*z), so only one set of samples is drawn per
+    N, and differences between grid points are not blurred by independent
+    Monte Carlo noise.
+
+    Parameters:
+    -----------
+    m, sigma: float or array of float
+        Means and standard deviations of the data
+    N: int or array of int
+        Sample sizes
+    alpha: float or array of float
+        Significance thresholds
+    n_trials: int
+        The number of simulated experiments per grid point
+    batch_size: int
+        Bound on the number of (experiment, grid point) values held at
+        once, plus the (experiment, observation) samples with sampler='raw'
+    random_state: None, int or numpy Generator
+        None uses the global numpy random state
+    sampler: str
+        'raw' or 'sufficient', see sample_experiments
+
+    Returns:
+    --------
+    rate: array of shape (len(m), len(sigma), len(N), len(alpha))
+        The rate of significant tests
+    mc_error: array, same shape
+        The Monte Carlo standard error of rate
+    coords: dict
+        The axis names ('m', 'sigma', 'N', 'alpha') and their values, in the
+        order of the array dimensions
+    """
+    coords = {'m': np.atleast_1d(np.asarray(m, dtype=float)),
+              'sigma': np.atleast_1d(np.asarray(sigma, dtype=float)),
+              'N': np.atleast_1d(np.asarray(N, dtype=int)),
+              'alpha': np.atleast_1d(np.asarray(alpha, dtype=float))}
+    random_state = check_random_state(random_state)
+    # the t value only depends on the standardized effect m/sigma
+    snr = coords['m'][:, np.newaxis] / coords['sigma'][np.newaxis, :]
+    counts = np.zeros(snr.shape + (coords['N'].size, coords['alpha'].size))
+
+    for i_n, n in enumerate(coords['N']):
+        t_crit = np.array([critical_t(n-1, a) for a in coords['alpha']])
+        # values held per experiment: its grid points, and its n samples
+        per_experiment = snr.size*coords['alpha'].size
+        if sampler == 'raw':
+            per_experiment += n
+        chunk = max(1, batch_size // per_experiment)
+        for start in range(0, n_trials, chunk):
+            size = min(chunk, n_trials - start)
+            z_mean, z_sem = sample_experiments(size, n, 0., 1.,
+                                               random_state=random_state,
+                                               sampler=sampler)
+            # t values of shape (size, len(m), len(sigma))
+            t = ((snr[np.newaxis] + z_mean[:, np.newaxis, np.newaxis])
+                 / z_sem[:, np.newaxis, np.newaxis])
+            counts[:, :, i_n, :] += (t[..., np.newaxis] >= t_crit).sum(axis=0)
+
+    rate = counts / n_trials
+    mc_error = np.sqrt(rate*(1 - rate)/n_trials)
+    return rate, mc_error, coords
+
+
+def sweep_to_frame(rate, mc_error, coords):
+    """
+    Put the result of rejection_rate_sweep in a pandas DataFrame, with one
+    row per grid point and columns 'rate' and 'mc_error'
+    """
+    import pandas as pd
+    index = pd.MultiIndex.from_product(list(coords.values()),
+                                       names=list(coords.keys()))
+    return pd.DataFrame({'rate': rate.ravel(), 'mc_error': mc_error.ravel()},
+                        index=index)
@@ -0,0 +1,190 @@
+"""
+Check the analytic power of the one sample t-test against simulated
+rejection rates, over a grid of (n, mu, sigma, alpha).
+
+For each grid point, enough experiments are simulated so that the Monte
+Carlo error is below the requested tolerance, and the points where the
+analytic power and the rejection rate differ by more than the Monte Carlo
+error allows are flagged. Meant to be run regularly, eg
+
+    python validate_power.py -n 5,16,30,100 -m 0,.2,.5 -s 1,2 -a .05,.001
+
+which exits with status 1 if a grid point is flagged.
+"""
+import sys
+from optparse import OptionParser
+
+import numpy as np
+
+from power_analysis import stat_power
+from ttest_sims import check_random_state, rejection_rate_sweep
+
+
+def trials_for_tolerance(power, tol=0.005, n_sigma=4.):
+    """
+    Number of simulated experiments so that n_sigma Monte Carlo standard
+    errors of a rejection rate with this power are at most tol
+
+    Returns:
+    --------
+    int or int array
+    """
+    variance = np.asarray(power)*(1 - np.asarray(power))
+    return np.maximum(np.ceil(variance*(n_sigma/tol)**2), 1).astype(int)
+
+
+def validate_power(n, mu, sigma, alpha=0.05, tol=0.005, n_sigma=4.,
+                   max_trials=10**7, batch_size=10**6, random_state=None,
+                   sampler='sufficient', power_function=stat_power):
+    """
+    Compare analytic and simulated power on the grid n x mu x sigma x alpha
+
+    For each n, the number of experiments is the one needed by the grid
+    point with the largest variance (see trials_for_tolerance), and the
+    experiments are simulated with rejection_rate_sweep.
+
+    Parameters:
+    -----------
+    n: int or array of int
+        Sample sizes
+    mu, sigma: float or array of float
+        Means and standard deviations of the data
+    alpha: float or array of float
+        Significance thresholds
+    tol: float
+        Disagreements larger than tol should be detected
+    n_sigma: float
+        A grid point is flagged when the rate is more than n_sigma Monte
+        Carlo standard errors away from the analytic power
+    max_trials: int
+        Bound on the number of experiments per n
+    batch_size: int
+        Bound on the number of (experiment, grid point) values held at once
+    random_state: None, int or numpy Generator
+        None uses the global numpy random state
+    sampler: str
+        'raw' or 'sufficient', see ttest_sims.sample_experiments
+    power_function: function
+        The analytic power to check, with the signature of stat_power
+
+    Returns:
+    --------
+    pandas DataFrame
+        Indexed by (m, sigma, N, alpha), with columns 'power', 'rate',
+        'mc_error' (standard error of rate if power is right), 'n_trials',
+        'z' ((rate - power) / mc_error) and 'flagged'
+    """
+    import pandas as pd
+
+    mu = np.atleast_1d(np.asarray(mu, dtype=float))
+    sigma = np.atleast_1d(np.asarray(sigma, dtype=float))
+    alpha = np.atleast_1d(np.asarray(alpha, dtype=float))
+    random_state = check_random_state(random_state)
+
+    frames = []
+    for n_i in np.atleast_1d(np.asarray(n, dtype=int)):
+        power = power_function(n_i, mu[:, None, None], sigma[None, :, None],
+                               alpha[None, None, :])
+        n_trials = int(min(trials_for_tolerance(power, tol, n_sigma).max(),
+                           max_trials))
+        rate, _, coords = rejection_rate_sweep(
+            mu, sigma, n_i, alpha, n_trials=n_trials, batch_size=batch_size,
+            random_state=random_state, sampler=sampler)
+        power = np.asarray(power).reshape(rate.shape)
+        mc_error = np.sqrt(power*(1 - power)/n_trials)
+        diff = rate - power
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(diff == 0, 0., diff / mc_error)
+        index = pd.MultiIndex.from_product(list(coords.values()),
+                                           names=list(coords.keys()))
+        frames.append(pd.DataFrame(
+            {'power': power.ravel(), 'rate': rate.ravel(),
+             'mc_error': mc_error.ravel(), 'n_trials': n_trials,
+             'z': z.ravel(), 'flagged': np.abs(z.ravel()) > n_sigma},
+            index=index))
+    return pd.concat(frames)
+
+
+def report(results, max_rows=20):
+    """
+    Short text summary of validate_power: the number of grid points,
+    simulated experiments and flagged points, the largest discrepancies,
+    and the flagged points themselves
+    """
+    flagged = results[results['flagged']]
+    lines = ["{} grid points, {} simulated experiments, {} flagged".format(
+                 len(results), int(results['n_trials'].groupby(
+                     level='N').first().sum()), len(flagged)),
+             "max |rate - power| {:.2g}, max |z| {:.2f}".format(
+                 (results['rate'] - results['power']).abs().max(),
+                 results['z'].abs().max())]
+    if len(flagged):
+        lines.append(flagged.head(max_rows).to_string())
+        if len(flagged) > max_rows:
+            lines.append("... and {} more".format(len(flagged) - max_rows))
+    return "\n".join(lines)
+
+
+def _floats(text):
+    """ comma separated list of floats """
+    return [float(x) for x in text.split(',')]
+
+
+def parse_args():
+    """Parse command-line arguments."""
+
+    parser = OptionParser(usage="%prog [options]")
+    parser.add_option('-n', '--n',
+                      default='5,10,16,30,50,100,300',
+                      dest='n',
+                      help='comma separated sample sizes')
+    parser.add_option('-m', '--mu',
+                      default='0,.1,.25,.5,1',
+                      dest='mu',
+                      help='comma separated means')
+    parser.add_option('-s', '--sigma',
+                      default='1,2',
+                      dest='sigma',
+                      help='comma separated standard deviations')
+    parser.add_option('-a', '--alpha',
+                      default='.05,.01,.001',
+                      dest='alpha',
+                      help='comma separated significance thresholds')
+    parser.add_option('-t', '--tol',
+                      default=0.005, type='float',
+                      dest='tol',
+                      help='largest disagreement allowed')
+    parser.add_option('-r', '--seed',
+                      default=None, type='int',
+                      dest='seed',
+                      help='random seed')
+    parser.add_option('-o', '--output',
+                      default=None,
+                      dest='output',
+                      help='write all the grid points to this csv file')
+
+    args, extras = parser.parse_args()
+    if extras:
+        parser.error('unexpected arguments {}'.format(extras))
+    args.n = [int(x) for x in _floats(args.n)]
+    args.mu, args.sigma, args.alpha = (_floats(args.mu), _floats(args.sigma),
+                                       _floats(args.alpha))
+    return args
+
+
+def main():
+    """
+    Validate stat_power on a grid, print the report and exit with status 1
+    if any grid point is flagged
+    """
+    args = parse_args()
+    results = validate_power(args.n, args.mu, args.sigma, args.alpha,
+                             tol=args.tol, random_state=args.seed)
+    print(report(results))
+    if args.output is not None:
+        results.to_csv(args.output)
+    sys.exit(1 if results['flagged'].any() else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Effect inflation ("winner's curse") of the one sample t-test: the expected
+effect of the experiments that are significant, compared to the true
+effect, as shown in evil-p and Misconceptions-Confidence-Intervals by
+`effect[detect].mean()` against `effect.mean()`.
+
+The expected effect is computed exactly from the truncated distributions.
+With Z = sqrt(n) mean / sigma ~ N(theta, 1), V = s^2 / sigma^2 (a chi-square
+over its df degrees of freedom) and t = Z / sqrt(V), the experiment is
+significant when Z > c sqrt(V), and
+
+    E[Z 1(Z > c sqrt(V))] = theta P(t > c) + E[phi(c sqrt(V) - theta)]
+
+The last term is a noncentral t density with one degree of freedom less,
+
+    E[phi(c sqrt(V) - theta)] = K nct.pdf(c sqrt((df - 1) / df), df - 1, theta)
+    K = sqrt((df - 1) / 2) Gamma((df - 1) / 2) / Gamma(df / 2)
+
+so that a grid of thousands of designs costs a few density evaluations and
+no simulation. With a known sigma (z-test), the significant Z are a
+truncated normal.
+"""
+import itertools
+
+import numpy as np
+import scipy.special as ssp
+import scipy.stats as sst
+
+from power_analysis import _scalar_or_array
+from ttest_sims import check_random_state, sample_experiments
+
+
+def _detected_z(df, theta, c, two_sided=False):
+    """
+    E[Z | significant] and the probability to be significant, for the
+    t-test with df degrees of freedom (inf for the z-test), noncentrality
+    theta and critical value c
+    """
+    if np.all(np.isinf(df)):
+        upper = sst.norm.sf(c - theta)
+        density = sst.norm.pdf(c - theta)
+        if two_sided:
+            upper = upper + sst.norm.cdf(-c - theta)
+            density = density - sst.norm.pdf(-c - theta)
+        return theta + density/upper, upper
+
+    upper = sst.nct.sf(c, df, theta)
+    log_k = (.5*np.log((df - 1)/2) + ssp.gammaln((df - 1)/2)
+             - ssp.gammaln(df/2))
+    t_shift = c*np.sqrt((df - 1)/df)
+    density = np.exp(log_k)*sst.nct.pdf(t_shift, df - 1, theta)
+    if two_sided:
+        # P(t < -c) as the upper tail of -t (see power_analysis._t_power)
+        upper = upper + sst.nct.sf(c, df, -theta)
+        density = density - np.exp(log_k)*sst.nct.pdf(-t_shift, df - 1,
+                                                      theta)
+    return theta + density/upper, upper
+
+
+def expected_detected_effect(n=16, mu=.3, sigma=1., alpha=0.05,
+                             two_sided=False, known_sigma=False):
+    """
+    Expected effect (sample mean) of the significant experiments
+    (broadcast over the arguments)
+
+    Parameters:
+    -----------
+    n: int or array of int
+        The number of subjects, at least 3 for the t-test
+    mu, sigma: float or array
+        The true effect and the standard deviation of the data
+    alpha: float or array
+        The risk of error (type I)
+    two_sided: bool
+        Significant when |t| is above the critical value of alpha/2,
+        otherwise when t is above the one of alpha (as `detect` in the
+        notebooks)
+    known_sigma: bool
+        z-test instead of t-test
+
+    Returns:
+    --------
+    float or array
+        nan where no experiment can be significant numerically (power
+        below ~1e-300)
+    """
+    n = np.asarray(n, dtype=float)
+    mu, sigma, alpha = (np.asarray(x, dtype=float) for x in (mu, sigma,
+                                                             alpha))
+    if not known_sigma and np.any(n < 3):
+        raise ValueError("n has to be at least 3, got {}".format(n.min()))
+    df = np.inf if known_sigma else n - 1
+    theta = np.sqrt(n)*mu/sigma
+    alpha = alpha/2 if two_sided else alpha
+    c = sst.norm.isf(alpha) if known_sigma else sst.t.isf(alpha, df)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z, _ = _detected_z(df, theta, c, two_sided)
+    return _scalar_or_array(sigma/np.sqrt(n)*z)
+
+
+def inflation(n=16, mu=.3, sigma=1., alpha=0.05, two_sided=False,
+              known_sigma=False):
+    """
+    Ratio of the expected effect of the significant experiments to the
+    true effect mu (see expected_detected_effect)
+
+    Returns:
+    --------
+    float or array
+        inf or nan where mu is 0
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _scalar_or_array(
+            np.asarray(expected_detected_effect(n, mu, sigma, alpha,
+                                                two_sided, known_sigma))
+            / np.asarray(mu))
+
+
+def simulated_detected_effect(n=16, mu=.3, sigma=1., alpha=0.05,
+                              Nexp=100000, two_sided=False,
+                              known_sigma=False, random_state=None,
+                              sampler='sufficient'):
+    """
+    Mean effect of the significant experiments among Nexp simulated ones
+
+    Returns:
+    --------
+    mean: float
+        nan if no experiment is significant
+    mc_error: float
+        Its Monte Carlo standard error
+    n_detected: int
+        The number of significant experiments
+    """
+    effect, std_error_mean = sample_experiments(
+        Nexp, n, mu, sigma, random_state=random_state, sampler=sampler)
+    if known_sigma:
+        std_error_mean = sigma/np.sqrt(n)
+    stat = effect/std_error_mean
+    c = (sst.norm.isf(alpha/(1 + two_sided)) if known_sigma
+         else sst.t.isf(alpha/(1 + two_sided), n - 1))
+    detect = (np.abs(stat) if two_sided else stat) > c
+    n_detected = int(detect.sum())
+    if n_detected < 2:
+        mean = float(effect[detect].mean()) if n_detected else np.nan
+        return mean, np.nan, n_detected
+    return (float(effect[detect].mean()),
+            float(effect[detect].std(ddof=1)/np.sqrt(n_detected)), n_detected)
+
+
+def check_inflation(n, mu, sigma=1., alpha=0.05, Nexp=100000,
+                    two_sided=False, known_sigma=False, random_state=None,
+                    sampler='sufficient'):
+    """
+    Compare expected_detected_effect with simulations on the grid
+    n x mu x sigma x alpha
+
+    Returns:
+    --------
+    pandas DataFrame
+        Indexed by (N, m, sigma, alpha), with columns 'expected',
+        'simulated', 'mc_error', 'n_detected' and 'z'
+        ((simulated - expected) / mc_error)
+    """
+    import pandas as pd
+
+    random_state = check_random_state(random_state)
+    grid = list(itertools.product(*(np.atleast_1d(x) for x in (n, mu, sigma,
+                                                               alpha))))
+    rows = []
+    for n_i, mu_i, sigma_i, alpha_i in grid:
+        expected = expected_detected_effect(n_i, mu_i, sigma_i, alpha_i,
+                                            two_sided, known_sigma)
+        simulated, mc_error, n_detected = simulated_detected_effect(
+            n_i, mu_i, sigma_i, alpha_i, Nexp, two_sided, known_sigma,
+            random_state, sampler)
+        rows.append((expected, simulated, mc_error, n_detected,
+                     (simulated - expected)/mc_error))
+    return pd.DataFrame(
+        rows, columns=['expected', 'simulated', 'mc_error', 'n_detected', 'z'],
+        index=pd.MultiIndex.from_tuples(grid,
+                                        names=['N', 'm', 'sigma', 'alpha']))